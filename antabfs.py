@@ -56,22 +56,36 @@
 # gonzalez     23/11/2020     - Added "form=wastro" support. Thanks to Jun Yang (Onsala) for reporting.
 # gonzalez     04/05/2021     - Fix Fila10g VSI masks extraction to correctly handle masks ending with 0.
 # marcote      12/06/2024     - Fix version of antabfs.py printed in antabfs files.
+# agent        17/10/2026     - New options: --follow (process the LOG file during the observation), --no-cache and --auto (flag without windows).
+#			      - The result of reading each LOG file and the parsed RXG files are saved under ~/.cache/antabfs (or $XDG_CACHE_HOME/antabfs)
+#				and used by the next runs until the LOG file, the RXG files or this program change.
+#			      - Lines whose time tag cannot be decoded are skipped instead of stopping the program.
+#			      - The Tsys lines after the start of a setup with no Tsys before the next one stay in their own setup (they went
+#				to the previous one or raised a NameError).
+#			      - A rectangle over the last points with no good scan after them replaces them with the geometric mean of all
+#				the good points instead of raising IndexError.
+#			      - TCAL table and receiver temperature of the RXG files read as the FS does.
+#			      - Faster reading of the LOG file, Tsys calculation, flagging and writing of the ANTAB file. The Tsys written are the same.
 #----------------------------------------------------------------------------------------------------------------------------------------------------------
 
 
 import sys
 import os
-from copy import copy
+import re
+import shutil
+import signal
+import cPickle
+import zlib
 import datetime
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from matplotlib.patches import Rectangle
-import statsmodels.api as smapi
-from statsmodels.sandbox.regression.predstd import wls_prediction_std
 import itertools
+import operator
 from time import sleep
 import argparse
+import bisect
 import math
 import struct
 import pydoc
@@ -79,10 +93,41 @@ import pydoc
 station = ""
 rxgfiles = ""
 
-version=20240512
+version=20261017
 
 debug = False
 
+followPoll = 10		# Seconds between two readings of a LOG file followed with --follow
+
+# Directory of the cache files: the RXG files read (rxgCacheFile) and the result of reading each LOG file (see logFile)
+cacheDirectory = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')), 'antabfs')
+
+# RXG files read by the previous runs (see rxg_cache). None: they are not saved
+rxgCacheFile = os.path.join(cacheDirectory, 'rxg_files.cache')
+
+# Version of the reading of the LOG files saved in their cache files. Increase it whenever logFile reads something
+# differently or saves something else, so the cache files of the previous versions are not used
+logCacheFormat = 1
+
+# Version of the RXG files saved in rxgCacheFile (rxgFile and rxgCatalog). Increase it whenever they read something
+# differently or keep something else, so the cache file of the previous versions is not used
+rxgCacheFormat = 1
+
+###______________________________________________________________###
+class rxgNumber(float):
+	'''
+	Number of an RXG file. It is a float which keeps the text it is written with in the file, so the
+	ANTAB header copies the values of the RXG file as they are (see antabHeader.dpfuLines).
+	'''
+
+	def __new__(cls, text):
+		number = float.__new__(cls, text)
+		number.text = text
+		return number
+
+	def __str__(self):
+		return self.text
+
 ###______________________________________________________________###
 class rxgFile:
 	'''
@@ -101,9 +146,13 @@ class rxgFile:
 	# 9th and following lines: Spillover versus frequency Format: Elevation Tspill
 	# Ends with: end_spillover_table
 	#-----------------------------------------------------------------------------------------------------
+	__paramLines = {'LO': 1, 'DATE': 2, 'FWHM': 3, 'POLS': 4, 'DPFU': 5, 'GAIN': 6, 'TCAL': 7, 'TREC': 8, 'SPILL': 9}	# Line of each parameter
+
 	def __init__(self, fileName):
 		'''Constructor.
-		It opens the file, reads its content and closes it. The content is stored in a private variable
+		It opens the file, reads its content and closes it. The content is stored in a private variable,
+		split into its sections and converted into the values of the parameters at once (see self.__parse
+		and self.__read).
 		@param fileName. Name of the RXG file
 		'''
 
@@ -115,6 +164,139 @@ class rxgFile:
 		except Exception, ex:
 			raise
 
+		self.__sections, self.__lineNumbers = self.__parse()
+		self.__model = self.__read()
+
+	# --------------------------------------------------------------------------------------------
+	def __parse(self):
+		'''
+		Split the content of the RXG file into the lines of each parameter, reading it only once.
+		Lines starting with * are comments and they are not counted. The n-th line is the parameter n
+		(see self.__paramLines), but TCAL and SPILL take all the lines until the next comment.
+		The lines of TCAL are counted too, as getLineFromParam always did.
+		@return The lines of each parameter and their numbers in the file
+		'''
+
+		lines = [n for n in range(len(self.fileContent)) if self.fileContent[n][0] != '*']
+		sections = dict()
+		lineNumbers = dict()
+		for param, lineNumber in self.__paramLines.items():
+			if lineNumber > len(lines):
+				sections[param] = []
+				continue
+			first = lines[lineNumber - 1]
+			last = first + 1
+			if param in ['TCAL', 'SPILL']:
+				while last < len(self.fileContent) and self.fileContent[last][0] != '*':
+					last += 1
+			sections[param] = self.fileContent[first:last]
+			lineNumbers[param] = range(first, last)
+
+		# TCAL table, receiver temperature and spillover table as the FS reads them, skipping the comments:
+		# the lines from the 7th one until the end of the TCAL table, the line after it and the lines until the
+		# end of the spillover table.
+		tcalEnd = [k for k in range(len(lines)) if 'end_tcal_table' in self.fileContent[lines[k]]] + [len(lines)]
+		lineNumbers['FS_TCAL'] = lines[self.__paramLines['TCAL'] - 1:tcalEnd[0]]
+		lineNumbers['FS_TREC'] = lines[tcalEnd[0] + 1:tcalEnd[0] + 2]
+		lineNumbers['FS_SPILL'] = []
+		for n in lines[tcalEnd[0] + 2:]:
+			if 'end_spillover_table' in self.fileContent[n]:
+				break
+			lineNumbers['FS_SPILL'].append(n)
+		for param in ['FS_TCAL', 'FS_TREC', 'FS_SPILL']:
+			sections[param] = [self.fileContent[n] for n in lineNumbers[param]]
+
+		return sections, lineNumbers
+
+	# --------------------------------------------------------------------------------------------
+	def __read(self):
+		'''
+		Convert the sections of the RXG file into the values of its parameters, only once. Each parameter
+		gets its fields as they are written in the file, which the string accessors return (date, pols, dpfu,
+		gain, lo, trec and tcal), and its value, which the other accessors return. Numbers are rxgNumber.
+		If the value of a parameter cannot be converted, the exception is kept and its accessors raise it.
+		'''
+
+		def line(param):
+			if not self.__sections[param]:
+				return None
+			return self.__sections[param][0].split()
+
+		def numbers(fields):
+			return [rxgNumber(value) for value in fields]
+
+		def gainCurve(fields):
+			coefs = []
+			for value in fields[2:]:
+				if value == 'opacity_corrected':
+					break
+				coefs.append(rxgNumber(value))
+			return fields[0], coefs, 'opacity_corrected' in fields[2:]
+
+		def tcalRows(fields):
+			rows = []
+			for n in range(len(fields)):
+				listtc = fields[n].split()
+				if len(listtc) and listtc[0] in ['rcp', 'lcp']:
+					rows.append((self.__lineNumbers['FS_TCAL'][n], listtc[0], float(listtc[1]), float(listtc[2])))
+			return rows
+
+		def spillArrays(fields):
+			table = [[float(value) for value in line.split()] for line in fields if line.split()]
+			return np.array([row[0] for row in table]), np.array([row[1] for row in table])
+
+		date = None
+		if self.__sections['DATE']:
+			date = self.__sections['DATE'][0].strip('\n')
+		tcal = [element.strip('\n') for element in self.__sections['FS_TCAL']]
+
+		model = dict()
+		model['LO'] = self.__convert(line('LO'), lambda fields: (fields[0], numbers(fields[1:])))
+		model['DATE'] = self.__convert(date, lambda fields: [int(value) for value in fields.split()])
+		model['FWHM'] = self.__convert(line('FWHM'), lambda fields: (fields[0], numbers(fields[1:])))
+		model['POLS'] = self.__convert(line('POLS'), list)
+		model['DPFU'] = self.__convert(line('DPFU'), numbers)
+		model['GAIN'] = self.__convert(line('GAIN'), gainCurve)
+		model['TCAL'] = self.__convert(tcal, tcalRows)
+		model['TREC'] = self.__convert(''.join(self.__sections['FS_TREC']).split(), numbers)
+		model['SPILL'] = self.__convert(list(self.__sections['FS_SPILL']), spillArrays)
+		return model
+
+	# --------------------------------------------------------------------------------------------
+	def __convert(self, fields, function):
+		'''
+		Returns the fields of a parameter and its value, or the exception raised converting it (see self.__read).
+		@param fields Fields of the parameter as written in the RXG file, or None if the file has not got its line
+		@param function Function that converts the fields
+		'''
+
+		if fields is None:
+			return fields, IndexError('list index out of range')
+		try:
+			return fields, function(fields)
+		except (ValueError, IndexError), ex:
+			return fields, ex
+
+	# --------------------------------------------------------------------------------------------
+	def __fields(self, param):
+		'''Returns the fields of a parameter as written in the RXG file. IndexError if the file has not got its line.
+		'''
+
+		fields = self.__model[param][0]
+		if fields is None:
+			raise self.__model[param][1]
+		return fields
+
+	# --------------------------------------------------------------------------------------------
+	def __value(self, param):
+		'''Returns the value of a parameter. It raises the exception of its conversion if it could not be converted.
+		'''
+
+		value = self.__model[param][1]
+		if isinstance(value, Exception):
+			raise value
+		return value
+
 	# --------------------------------------------------------------------------------------------
 	def getLineFromParamName(self, param, star):
 		'''
@@ -163,7 +345,9 @@ class rxgFile:
 		assuming there is correspondence between the line number and the parameter
 		Lines starting with * are skipped during the count since they are considered comments
 		TCAL and SPILL are special cases because they have ain unknown number of lines in their section.
-		Eevery time we read line from TCAL we have to play with the counter. See the code below.
+		The lines are taken from the sections split when the file was read (see self.__parse).
+		The lines of TREC and SPILL are only right if the TCAL table has one line: trec and spillTable
+		read them after the end of the TCAL table, as the FS does.
 
 		@param param Parameter we are looking for.
 
@@ -171,60 +355,10 @@ class rxgFile:
 		'''
 
 		param = parameter.upper()
-		lineParamArray = []
-
-		if param == 'LO':
-			lineNumber = 1
-		elif param == 'DATE':
-			lineNumber = 2
-		elif param == 'FWHM':
-			lineNumber = 3
-		elif param == 'POLS':
-			lineNumber = 4
-		elif param == 'DPFU':
-			lineNumber = 5
-		elif param == 'GAIN':
-			lineNumber = 6
-		elif param == 'TCAL':
-			lineNumber = 7
-		elif param == 'TREC':
-			lineNumber = 8
-		elif param == 'SPILL':
-			lineNumber = 9
-		else:
-			print "Unknown param"
-			raise ex
+		if not param in self.__paramLines:
+			raise ValueError("Unknown param %s" % parameter)
 
-
-		i = 1
-		line7 = False
-		line9 = False
-		for line in self.fileContent:
-			if line[0] == '*':
-				# If we find a * after having reached the 7th line that means we have already read
-				# all lines in that section => Turn it off and break (get out of the loop)
-				if line7:
-					line7 = False
-					break
-				if line9:
-					line9 = False
-					break
-			else:
-				if i == lineNumber:
-					if lineNumber == 7:
-						line7 = True
-						lineParamArray.append( line )
-						i = i - 1
-					elif lineNumber == 9:
-						line9 = True
-						lineParamArray.append( line )
-						i = i - 1
-					else:
-						lineParamArray.append( line )
-						break
-				i = i + 1
-
-		return lineParamArray
+		return list(self.__sections[param])
 
 	# --------------------------------------------------------------------------------------------
 	def name(self):
@@ -234,83 +368,113 @@ class rxgFile:
 
 	# --------------------------------------------------------------------------------------------
 	def date(self):
-		'''Returns the date of creation or last modification of the RXG file
+		'''Returns the date of creation or last modification of the RXG file (see dateValues)
 		'''
 
-		dateLine = self.getLineFromParam('Date')[0]
-		dateLine = dateLine.strip('\n')
-
-		return dateLine
+		return self.__fields('DATE')
 	# --------------------------------------------------------------------------------------------
 	def pols(self):
 		'''Returns a list with the available polarizations. For example: ['lcp', 'rcp'] or ['rcp']
 		'''
 
-		polsLine = self.getLineFromParam('POLS')[0]
-		polsList = polsLine.split()
-
-		return polsList
+		return list(self.__fields('POLS'))
 	# --------------------------------------------------------------------------------------------
 	def dpfu(self):
 		'''Returns a list with the DPFU. The values are sorted according to the polarization. For example
-		[valuercp, valuelcp]. Beware that values are returned as strings not floats !!!
+		[valuercp, valuelcp]. Beware that values are returned as strings not floats !!! (see dpfuValues)
 		'''
 
-		dpfuLine = self.getLineFromParam('DPFU')[0]
-		dpfuList = dpfuLine.split()
-
-		return dpfuList
+		return list(self.__fields('DPFU'))
 	# --------------------------------------------------------------------------------------------
 	def gain(self):
-		'''Returns a list with the GAIN.
+		'''Returns a list with the GAIN (see gainPoly).
+		'''
+
+		return list(self.__fields('GAIN'))
+
+	# --------------------------------------------------------------------------------------------
+	def gainCurve(self):
+		'''Returns the gain curve as (type, coefficients, opacity corrected). The type is ELEV (polynomial of the
+		elevation) or ALTAZ (polynomial of the zenith angle), the coefficients are gainPoly (the same values as the
+		POLY= line of the ANTAB header) in a NumPy array, starting with the constant term, and opacity corrected is
+		True if the line ends with opacity_corrected. Format: ELEV POLY c0 c1 c2 ... [opacity_corrected]
+		'''
+
+		gainType, coefs, opacity = self.__value('GAIN')
+		return gainType.upper(), np.array(self.gainPoly(), dtype=float), opacity
+
+	# --------------------------------------------------------------------------------------------
+	def gainValues(self, elevation):
+		'''Returns the gain curve evaluated at every elevation at once (NumPy array).
+		@param elevation Elevation in degrees (number or array)
+		'''
+
+		gainType, coefs, opacity = self.gainCurve()
+		x = np.asarray(elevation, dtype=float)
+		if gainType == 'ALTAZ':
+			x = 90. - x
+		if not len(coefs):
+			return np.zeros(x.shape)
+		return np.polyval(coefs[::-1], x)
+
+	# --------------------------------------------------------------------------------------------
+	def dpfuGain(self, elevation, pol):
+		'''Returns DPFU x gain (K/Jy) at every elevation at once (NumPy array).
+		@param elevation Elevation in degrees (number or array)
+		@param pol Polarization: RCP or LCP. ValueError if the RXG file has not got it.
 		'''
 
-		gainLine = self.getLineFromParam('GAIN')[0]
-		gainList = gainLine.split()
+		pols = [p.lower() for p in self.pols()]
+		if not pol.lower() in pols:
+			raise ValueError('%s not in the polarizations of %s' % (pol, self.rxgname))
+		return self.dpfuValues()[pols.index(pol.lower())] * self.gainValues(elevation)
+
+	# --------------------------------------------------------------------------------------------
+	def sefd(self, tsys, elevation, pol):
+		'''Returns the SEFD (Jy) = Tsys / (DPFU x gain) of a Tsys series at once (NumPy array). The Tsys which are
+		not positive (not valid) give NaN.
+		@param tsys Tsys in K (number or array)
+		@param elevation Elevation in degrees of each Tsys (number or array)
+		@param pol Polarization: RCP or LCP
+		'''
 
-		return gainList
+		tsys, kPerJy = np.broadcast_arrays(np.asarray(tsys, dtype=float), self.dpfuGain(elevation, pol))
+		sefd = np.empty(tsys.shape)
+		sefd.fill(np.nan)
+		np.divide(tsys, kPerJy, out=sefd, where=(tsys > 0) & (kPerJy != 0))
+		return sefd
 
 	# --------------------------------------------------------------------------------------------
 	def lo(self):
-		'''Returns a list with the local oscillators.
+		'''Returns a list with the local oscillators (see loRange).
 		The file can have this line:
 				range 4000 4300
 		or this one:
 				fixed 4158
 		'''
 
-		loList = []
-
-		loLine = self.getLineFromParam('LO')[0]
-		auxList = loLine.split()
-
-		if auxList[0] == 'range':
-			loType = 'range'
-		elif auxList[0] == 'fixed':
-			loType = 'fixed'
-
-		for element in auxList[1:]:
-			loList.append(element)
+		auxList = self.__fields('LO')
+		loType = auxList[0]
 
 		# We do not use loType. If fixed the array will only contain 1 element if range it will contain 2 elements.
 
-		return loList
+		return auxList[1:]
 
 	# --------------------------------------------------------------------------------------------
 	def trec(self):
-		'''Returns the line with the Receiver temperature. It may contain one or two values
+		'''Returns the line with the Receiver temperature (see trecValues). It may contain one or two values
 		Line looks like:
 			8.0 8.0
+		It is the line after the end of the TCAL table, as the FS reads it, and not the 8th line
+		of getLineFromParam('TREC'), which is a TCAL line if the TCAL table has more than one line.
 		'''
 
-		trecLine = self.getLineFromParam('TREC')[0]
-		trecList = trecLine.split()
-
-		return trecList
+		return list(self.__fields('TREC'))
 
 	# --------------------------------------------------------------------------------------------
 	def tcal(self):
-		'''Returns an array with the tcal lines
+		'''Returns an array with the lines of the TCAL table, as the FS reads it: from the 7th line to end_tcal_table,
+		without comments (see tcalTable)
 		Lines look like this:
 			lcp 4650.0 1.5
 			lcp 4700.0 1.0
@@ -318,17 +482,7 @@ class rxgFile:
 			rcp 4700.0 1.0
 		'''
 
-		tcalArray = []
-		tcalArrayLine = self.getLineFromParam('TCAL')
-
-		# The last element contains a string with "end_tcal_table" and we have to drop it out.
-		for element in tcalArrayLine:
-			if 'end_tcal_table' in element:
-				continue
-			else:
-				tcalArray.append( element.strip('\n') )
-
-		return tcalArray
+		return list(self.__fields('TCAL'))
 
 	# --------------------------------------------------------------------------------------------
 	def freqCal(self):
@@ -339,23 +493,11 @@ class rxgFile:
 		TCAL for LCP
 		'''
 
-		freqRCPArray = []
-		freqLCPArray = []
-		tcalRCPArray = []
-		tcalLCPArray = []
-
-		tcArray = self.tcal()
-
-		for element in tcArray:
-			listtc = element.split()
-			if len(listtc) == 0:
-				continue
-			elif listtc[0] == 'rcp':
-				freqRCPArray.append( float(listtc[1]) )
-				tcalRCPArray.append( float(listtc[2]) )
-			elif listtc[0] == 'lcp':
-				freqLCPArray.append( float(listtc[1]) )
-				tcalLCPArray.append( float(listtc[2]) )
+		rows = self.__value('TCAL')
+		freqRCPArray = [row[2] for row in rows if row[1] == 'rcp']
+		tcalRCPArray = [row[3] for row in rows if row[1] == 'rcp']
+		freqLCPArray = [row[2] for row in rows if row[1] == 'lcp']
+		tcalLCPArray = [row[3] for row in rows if row[1] == 'lcp']
 
 		return freqRCPArray, tcalRCPArray, freqLCPArray, tcalLCPArray
 
@@ -386,34 +528,385 @@ class rxgFile:
 		frA, trA, flA, tlA = self.freqCal()
 		fcArray = []
 		if pol.lower() == 'rcp':
-			if len(frA) > 0:
-				i = 0
-				while i < len(frA):
-					fcArray.append([frA[i], trA[i]])
-					i = i + 1
+			fcArray = [[frA[i], trA[i]] for i in range(len(frA))]
 		elif pol.lower() == 'lcp':
-			if len(flA) > 0:
-				i = 0
-				while i < len(flA):
-					fcArray.append([flA[i], tlA[i]])
-					i = i + 1
+			fcArray = [[flA[i], tlA[i]] for i in range(len(flA))]
 
 		return fcArray
 
+	# --------------------------------------------------------------------------------------------
+	def loRange(self):
+		'''Returns the LO frequencies (MHz) of the RXG file as (minimum, maximum).
+		Both are the same for a fixed LO.
+		'''
+
+		loType, values = self.__value('LO')
+		if len(values) == 1:			# fixed LO
+			return values[0], values[0]
+		return values[0], values[1]
+
+	# --------------------------------------------------------------------------------------------
+	def dateValues(self):
+		'''Returns the date of the RXG file as a list of integers: [year, month, day], or [0] if it is valid for all.
+		'''
+
+		return list(self.__value('DATE'))
+
+	# --------------------------------------------------------------------------------------------
+	def fwhm(self):
+		'''Returns the FWHM beamwidth model: its type ('frequency' or 'constant') and its values (floats).
+		'''
+
+		fwhmType, values = self.__value('FWHM')
+		return fwhmType, list(values)
+
+	# --------------------------------------------------------------------------------------------
+	def dpfuValues(self):
+		'''Returns a list with the DPFU as floats, sorted as the polarizations (see pols).
+		'''
+
+		return list(self.__value('DPFU'))
+
+	# --------------------------------------------------------------------------------------------
+	def gainPoly(self):
+		'''Returns the coefficients (floats) of the gain curve polynomial, ELEV POLY c0 c1 c2 ... [opacity_corrected]
+		'''
+
+		gainType, coefs, opacity = self.__value('GAIN')
+		return list(coefs)
+
+	# --------------------------------------------------------------------------------------------
+	def tcalTable(self, pol):
+		'''Returns the TCAL table of a polarization as two NumPy arrays: frequencies and Tcal, in the order of the file.
+		@param pol  Polarization: RCP or LCP
+		'''
+
+		rows = [row for row in self.__value('TCAL') if row[1] == pol.lower()]
+		return np.array([row[2] for row in rows]), np.array([row[3] for row in rows])
+
+	# --------------------------------------------------------------------------------------------
+	def trecValues(self):
+		'''Returns the receiver temperature (floats), from the line after the TCAL table as the FS reads it (see trec).
+		'''
+
+		return list(self.__value('TREC'))
+
+	# --------------------------------------------------------------------------------------------
+	def spillTable(self):
+		'''Returns the spillover table as two NumPy arrays: elevations and Tspill.
+		'''
+
+		elevations, tspill = self.__value('SPILL')
+		return elevations.copy(), tspill.copy()
+
+	# --------------------------------------------------------------------------------------------
+	def tcalLines(self):
+		'''Returns the LO and TCAL lines of the RXG file as get_tcal reads them (see get_tcals): the LO line
+		[(line number, minimum, maximum)], empty if it is neither range nor fixed, and the pairs of TCAL lines
+		{pol: (line numbers, freq1, freq2, tcal1, tcal2)}. Pairs are two consecutive lines of the same pol.
+		A fixed LO covers +-10 MHz. It raises the exception of the LO or TCAL values that could not be converted.
+		'''
+
+		loType, values = self.__value('LO')
+		limits = []
+		if loType == 'range':
+			limits.append((self.__lineNumbers['LO'][0], values[0], values[1]))
+		elif loType == 'fixed':
+			limits.append((self.__lineNumbers['LO'][0], values[0]-10, values[0]+10))
+
+		rows = self.__value('TCAL')
+		pairs = dict()
+		for k in range(len(rows) - 1):
+			if rows[k+1][0] == rows[k][0] + 1 and rows[k+1][1] == rows[k][1]:
+				pairs.setdefault(rows[k][1], []).append((rows[k][0], rows[k][2], rows[k+1][2], rows[k][3], rows[k+1][3]))
+		for pol in pairs.keys():
+			pairs[pol] = tuple(np.array(column) for column in zip(*pairs[pol]))
+		return limits, pairs
+
+###______________________________________________________________###
+class rxgCatalog:
+	'''
+	Index of the RXG files of a station by LO frequency. The RXG files are read only once and
+	the RXG file of a LO is found with a binary search (see get_rxg_catalog).
+	'''
+
+	def __init__(self, directory, fileNames, stationName):
+		'''Constructor.
+		It reads the LO frequencies of the RXG files and makes the index.
+		@param directory Directory of the RXG files
+		@param fileNames Names of the RXG files given by the user (-f), in the order they are checked,
+				 or None to check all RXG files in the directory with the station code in their names.
+		@param stationName Station code
+		'''
+
+		self.directory = directory
+		self.__stamps = []		# (file or directory name, size and modification time) of what was read. See self.isValid
+		self.__entries = []		# (file name, LO minimum, LO maximum), in the order the RXG files are checked
+		self.__error = None		# (exception, message) of the first RXG file that cannot be read
+
+		if fileNames:
+			ficherosRXG = fileNames
+		else:
+			ficherosRXG = list_rxg_directory(directory)
+			self.__stamps.append((directory, rxg_file_stamp(directory)))
+
+		stcode = stationName[0].upper()+stationName[1].lower()
+		for fileN in ficherosRXG:
+			if not fileN.endswith(".rxg"):
+				continue
+			if stcode not in fileN and not fileNames:	# If the rxgfiles are provided no need to check the name
+				continue
+			fileName = "%s/%s" % (directory, fileN)
+			self.__stamps.append((fileName, rxg_file_stamp(fileName)))
+			try:
+				rxgF = get_rxg_file(fileName)
+			except Exception, ex:
+				self.__error = (ex, None)
+				break
+			try:
+				freqStart, freqEnd = rxgF.loRange()
+			except Exception, ex:
+				self.__error = (ex, "Error getting LO freq")
+				break
+			self.__entries.append((fileName, freqStart, freqEnd))
+
+		# The LO frequencies are split by the limits of all RXG files. Each limit and each interval between
+		# two limits gets the first RXG file (in order) that covers it.
+		self.__limits = sorted(set([entry[1] for entry in self.__entries] + [entry[2] for entry in self.__entries]))
+		self.__atLimit = []
+		self.__afterLimit = []
+		for k in range(len(self.__limits)):
+			self.__atLimit.append(self.__first(self.__limits[k], self.__limits[k]))
+			if k + 1 < len(self.__limits):
+				self.__afterLimit.append(self.__first(self.__limits[k], self.__limits[k+1]))
+
+	# --------------------------------------------------------------------------------------------
+	def isValid(self):
+		'''Returns True if the RXG directory and the RXG files read have not changed since the index was made.
+		'''
+
+		for fileName, stamp in self.__stamps:
+			if rxg_file_stamp(fileName) != stamp:
+				return False
+		return True
+
+	# --------------------------------------------------------------------------------------------
+	def __first(self, freqStart, freqEnd):
+		'''Returns the order of the first RXG file whose LO range contains [freqStart, freqEnd], or None
+		'''
+
+		for order in range(len(self.__entries)):
+			if self.__entries[order][1] <= freqStart and freqEnd <= self.__entries[order][2]:
+				return order
+		return None
+
+	# --------------------------------------------------------------------------------------------
+	def fileName(self, freqLOMHz):
+		'''Returns the name of the RXG file which matches the LO frequency, or " " if there is none.
+		@param freqLOMHz LO frequency in MHz
+		'''
+
+		k = bisect.bisect_left(self.__limits, freqLOMHz)
+		if k < len(self.__limits) and self.__limits[k] == freqLOMHz:
+			order = self.__atLimit[k]
+		elif 0 < k < len(self.__limits):
+			order = self.__afterLimit[k-1]
+		else:
+			order = None
+
+		if order is None and self.__error is not None:		# The RXG files after the one that could not be read are unknown
+			if self.__error[1]:
+				print self.__error[1]
+			raise self.__error[0]
+		if order is None:
+			return " "
+		return self.__entries[order][0]
+
+###______________________________________________________________###
+class tsysTable:
+	'''
+	Columnar storage of the Tsys calculated from the LOG file.
+	There is a float64 Tsys matrix for each setup, with a column for each DBBC channel of the setup.
+	For all Tsys, in the order they were calculated, there are a float64 time column (seconds since 1970.01.01),
+	an int32 scan column and the setup and the row of its Tsys matrix where each Tsys is.
+	The arrays double their size when they are full, so appending a Tsys does not make any Python object.
+	'''
+
+	#-----------------------------------------------------------------------------------------------------
+	def __init__(self, capacity=1024):
+		'''Constructor.
+
+		@param capacity Number of Tsys that can be stored before the arrays grow.
+		'''
+
+		self.__size = 0
+		self.__capacity = capacity
+		self.__time = np.empty(capacity)
+		self.__scan = np.empty(capacity, dtype=np.int32)
+		self.__setupInd = np.empty(capacity, dtype=np.int32)	# Index of the setup in self.__setups
+		self.__row = np.empty(capacity, dtype=np.int32)		# Row of the Tsys matrix of the setup
+
+		self.__setups = []	# Setup names
+		self.__tsys = []	# Tsys matrix of each setup
+		self.__rows = []	# Rows used in the Tsys matrix of each setup
+
+	#-----------------------------------------------------------------------------------------------------
+	def __len__(self):
+		return self.__size
+
+	#-----------------------------------------------------------------------------------------------------
+	def append(self, setup, time, scan, tsys):
+		'''Store a Tsys.
+
+		@param setup Setup name
+		@param time Time tag in seconds since 1970.01.01
+		@param scan Scan number
+		@param tsys List with the Tsys of each DBBC channel of the setup
+		'''
+
+		if self.__size == len(self.__time):
+			self.__time = self.__grow(self.__time)
+			self.__scan = self.__grow(self.__scan)
+			self.__setupInd = self.__grow(self.__setupInd)
+			self.__row = self.__grow(self.__row)
+
+		if not setup in self.__setups:
+			self.__setups.append(setup)
+			self.__tsys.append(np.empty((self.__capacity, len(tsys))))
+			self.__rows.append(0)
+		ind = self.__setups.index(setup)
+
+		matrix = self.__tsys[ind]
+		row = self.__rows[ind]
+		if row == matrix.shape[0]:
+			matrix = self.__grow(matrix)
+		if len(tsys) > matrix.shape[1]:			# The Tsys stored before had less channels
+			missing = np.empty((matrix.shape[0], len(tsys) - matrix.shape[1]))
+			missing.fill(np.nan)
+			matrix = np.concatenate((matrix, missing), axis=1)
+		self.__tsys[ind] = matrix
+		matrix[row, :len(tsys)] = tsys
+		matrix[row, len(tsys):] = np.nan		# Some channels may have no Tsys
+		self.__rows[ind] = row + 1
+
+		self.__time[self.__size] = time
+		self.__scan[self.__size] = scan
+		self.__setupInd[self.__size] = ind
+		self.__row[self.__size] = row
+		self.__size += 1
+
+	#-----------------------------------------------------------------------------------------------------
+	def __grow(self, array):
+		'''
+		Return a copy of the array with twice as many rows.
+		'''
+
+		grown = np.empty((2*array.shape[0],) + array.shape[1:], dtype=array.dtype)
+		grown[:array.shape[0]] = array
+		return grown
+
+	#-----------------------------------------------------------------------------------------------------
+	def time(self):
+		'''
+		Return the time tags (seconds since 1970.01.01) of all Tsys.
+		'''
+
+		return self.__time[:self.__size]
+
+	#-----------------------------------------------------------------------------------------------------
+	def scan(self):
+		'''
+		Return the scan numbers of all Tsys.
+		'''
+
+		return self.__scan[:self.__size]
+
+	#-----------------------------------------------------------------------------------------------------
+	def tsys(self, start=0, end=None):
+		'''
+		Return a new matrix with the Tsys between the positions start and end, one row for each Tsys and one column
+		for each DBBC channel. If they belong to setups with different number of channels, the missing columns are NaN.
+		An empty array is returned if there is no Tsys.
+		'''
+
+		if end is None or end > self.__size:
+			end = self.__size
+		setupInd = self.__setupInd[start:end]
+		row = self.__row[start:end]
+		if len(row) == 0:
+			return np.array([])
+
+		if np.all(setupInd == setupInd[0]):
+			return self.__tsys[setupInd[0]][row]
+
+		tsys = np.empty((len(row), max([self.__tsys[ind].shape[1] for ind in set(setupInd)])))
+		tsys.fill(np.nan)
+		for ind in set(setupInd):
+			cond = setupInd == ind
+			tsys[cond, :self.__tsys[ind].shape[1]] = self.__tsys[ind][row[cond]]
+		return tsys
+
+	#-----------------------------------------------------------------------------------------------------
+	def __getitem__(self, i):
+		'''
+		Return the Tsys at position i, with a value for each DBBC channel of its setup.
+		'''
+
+		if i < 0:
+			i += self.__size
+		if not 0 <= i < self.__size:
+			raise IndexError(i)
+		return self.__tsys[self.__setupInd[i]][self.__row[i]]
+
+	#-----------------------------------------------------------------------------------------------------
+	def __getstate__(self):
+		'''
+		Only the used part of the arrays is saved in the cache file (see logFile.__saveCache).
+		'''
+
+		state = self.__dict__.copy()
+		for name in ['time', 'scan', 'setupInd', 'row']:
+			state['_tsysTable__' + name] = state['_tsysTable__' + name][:self.__size].copy()
+		state['_tsysTable__tsys'] = [matrix[:rows].copy() for matrix, rows in zip(self.__tsys, self.__rows)]
+		return state
+
 ###______________________________________________________________###
 class logFile:
 	'''
 	Utility class to manage the log file
 	'''
 
+	# FS record prefix: time tag (yyyy.ddd.hh:mm:ss.ss), record marker and name of the command, procedure or response.
+	# Procedure lines also have the command that was executed inside the procedure: "&setup01/cont_cal=on"
+	__recordRe = re.compile(r'.{20}([&:;/#])([\w#]*)(?:/(\w*))?')
+
+	# Variables with the result of reading the LOG file that are saved in the cache file (see self.__saveCache)
+	__cached = ['logData', 'channels', 'scans', 'freqLOMHzArray', 'ifdSetup', 'polArray', 'bandArray', 'dbbcModeName', 'calModeName', 'lastCalMode']
+
+	# Fields of the table of DBBC channels of each ANTAB header (see self.channelTables): index label (R1), IF (A), BBC number,
+	# sky frequency (MHz), sideband (L or U), bandwidth (MHz), Tcal (K) and polarization (rcp). Numbers as written in the header.
+	__channelType = np.dtype([('label', 'S8'), ('if', 'S8'), ('bbc', int), ('freq', float), ('sideband', 'S1'), ('bw', float), ('tcal', float), ('pol', 'S8')])
+
+	# Fields of the table of scans (see self.scanTable): scan number, scan name, source and time tag of the source line
+	# (seconds since 1970), where the scan comment is written in the ANTAB file. The names are as long as the longest one.
+	__scanFields = [('num', int), ('name', 'S'), ('source', 'S'), ('time', float)]
+
+	# Time tag of the LOG lines: "yyyy.ddd.hh:mm:ss.ss"
+	__timeTagRe = re.compile(r'(\d{4})\.(\d{3})\.(\d\d):(\d\d):(\d\d)\.(\d\d)')
+
 	#-----------------------------------------------------------------------------------------------------
-	def __init__(self, fileName):
+	def __init__(self, fileName, follow=False, cache=False):
 		'''Constructor.
-		It opens the LOG file, reads its content and closes it. The content is stored in a private variable: self.fileContent
-		Other variables are also stored like:
+		It opens the LOG file, reads it line by line and closes it. The content is not kept in memory: every line is
+		processed as soon as it is read (see self.__readLog). Other variables are also stored like:
 				self.logname, self.stationName, self.expName, self.freqLOMHzArray, self.polArray
 
 		@param fileName. Name of the LOG file including the PATH
+		@param follow. If True, the LOG file is still being written by the FS. The lines already written are read
+			       and the reading goes on with self.update() and self.finish() (see self.__followLines).
+		@param cache. If True, the result of reading the LOG file is saved in a file under cacheDirectory (see
+			      self.__cacheName) and it is loaded instead of reading the LOG file again, until the LOG file or the RXG files change
+			      (see self.__cacheKey). It is not used if the LOG file is followed.
 		'''
 
 		self.__rxgDirectory = "/usr2/control/rxg_files"
@@ -425,8 +918,6 @@ class logFile:
 		self.expName = exp_station[0:-2].lower()
 		try:
 			logfIn = open(fileName, 'r')
-			self.fileContent = logfIn.readlines()
-			logfIn.close()
 		except Exception, ex:
 			raise
 
@@ -439,6 +930,8 @@ class logFile:
 		self.calModeName = dict()
 		self.lastCalMode = None
 		self.logData = []
+		self.channels = []		# Table of DBBC channels of each ANTAB header. See self.channelTables
+		self.scans = None		# Table of scans. See self.scanTable
 
 		self.__bbcinfo = dict()
 		self.__vsiCh = dict()
@@ -449,19 +942,29 @@ class logFile:
 		self.__scanNum = 0
 		self.__scanName = None
 		self.__dataValid = False
-		self.__dtStartInt = None
+		self.__startInt = None		# Time tag (microseconds) of the beginning of the integration
 		self.__intComplete = False
 		self.__tempDict = [dict(), dict(), dict(), dict()] # tpiprime, tpical, tpidiff and tcal (The latest should always be tcal)-> SINGLE CALIBRATION MODE (Changed if use CONT)
+		self.__chSlot = dict()		# DBBC channel -> row of the tpicd running sums
+		self.__tpicdSum = np.zeros((64, 2))		# Running sums of the tpicd values of the integration (columns: self.__tempDict[0] and [1])
+		self.__tpicdCount = np.zeros((64, 2), dtype=int)	# Number of tpicd values in self.__tpicdSum
+		self.__tpicdLayouts = dict()	# Channels of a tpicd line -> (positions in the sums, fields of the values, getter). See self.__addTpicd
+		self.__tpicdPositions = []	# Positions in the running sums of the tpicd values not added to them yet
+		self.__tpicdValues = []		# tpicd values not added to the running sums yet
+		self.__tsysSlotsDict = dict()	# List of DBBC channels -> rows in the running sums. See self.__tsysSlots
 		self.__headerComp = False
 		self.__bbccodelist = dict()
 		self.__bw = dict()
 		self.__bbcfq = dict()
 		self.__whichif = dict()
-		self.__intTime = datetime.timedelta(0,1) # Integration time. Set to 1 seconds.
+		self.__intTime = 1000000 # Integration time in microseconds. Set to 1 seconds.
 		self.__pfbFreq = [1040,1008,976,944,912,880,848,816,784,752,720,688,656,624,592,560]
-		self.__tsyslogDict = dict()
+		self.__tsyslogLayouts = dict()	# Fields of a Tsys line -> (columns, values getter, last value missing). See self.__getTsysLog
+		self.__tsyslogColumns = dict()	# DBBC channel -> column of the Tsys table. See self.__tsyslogMeans
+		self.__tsyslogPending = []	# Tsys lines not read yet
+		self.__tsyslogBlocks = []	# Tsys lines read: (time tags, line of each value, columns, values)
 
-		self.__scanline = []
+		self.__scans = []		# Scans read: (number, name, source, time tag)
 		self.__indexline = []
 		self.__header = []
 		self.__tsyslog = []
@@ -483,10 +986,213 @@ class logFile:
 				       'wastro': ['1u','2u','3u','4u','5u','6u','7u','8u','1l','2l','3l','4l','5l','6l','7l','8l','9u','au','bu','cu','du','eu','fu','gu','9l','al','bl','cl','dl','el','fl','gl']}
 
 		self.__epoch = datetime.datetime.utcfromtimestamp(0)
+		self.__newOrder = self.__microseconds(datetime.datetime(2015,9,17))	# Change of the tpicd order (see self.__getTsys)
+
+		self.__dispatch = dict()	# Handlers for each kind of LOG record found. See self.__classify
+		self.__nextLine = ""		# Line after the one being read. Needed to know if the integration is complete
+		self.__times = dict()		# Time tags already decoded of the last lines read. See self.__getTime
+
+		self.__tsys = tsysTable()	# Calculated Tsys with their time and scan tags
+
+		self.__fileName = fileName
+		self.__following = follow
+		self.__offset = 0		# Bytes of the LOG file already read when it is followed
+		self.__heldLine = None		# Last line read when the LOG file is followed. It waits for its next line
+
+		# Name of the LOG file and a hash of its path: LOG files with the same name in other directories do not share it
+		self.__cacheName = os.path.join(cacheDirectory, '%s.%08x.cache' % (os.path.basename(fileName), zlib.crc32(os.path.abspath(fileName)) & 0xffffffff))
+		cacheKey = None
+		if cache and not follow:
+			cacheKey = self.__cacheKey()
+			if self.__loadCache(cacheKey):
+				logfIn.close()
+				return
+
+		try:
+			if follow:
+				self.__readLog(self.__followLines(logfIn))
+			else:
+				self.__readLog(self.__withNextLine(logfIn))
+		finally:
+			logfIn.close()
+
+		if cacheKey is not None:
+			self.__saveCache(cacheKey)
+
+	#------------------------------------------------------------------------------------
+	def __cacheKey(self):
+		'''
+		Returns what the saved result of reading the LOG file depends on: the version of this program and of the reading
+		of the LOG file (logCacheFormat), the size and modification
+		time of the LOG file and the names, sizes and modification times of the RXG files that can be read to get Tcal (see get_tcal).
+		'''
+
+		global rxgfiles
+		if rxgfiles:
+			rxgNames = rxgfiles
+		else:
+			rxgNames = [i for i in list_rxg_directory(self.__rxgDirectory) if i.endswith('.rxg')]
+
+		rxgKey = []
+		for rxgName in sorted(rxgNames):
+			try:
+				rxgStat = os.stat("%s/%s" % (self.__rxgDirectory, rxgName))
+				rxgKey.append((rxgName, rxgStat.st_size, rxgStat.st_mtime))
+			except OSError:
+				rxgKey.append((rxgName, None, None))
+
+		logStat = os.stat(self.__fileName)
+		return (version, logCacheFormat, self.__cached, os.path.abspath(self.__fileName), logStat.st_size, logStat.st_mtime, rxgKey)
 
-		self.__readLog()
 	#------------------------------------------------------------------------------------
-	def __readLog(self):
+	def __loadCache(self, cacheKey):
+		'''
+		Load the result of reading the LOG file from the cache file, if it was saved with the same key.
+
+		@param cacheKey See self.__cacheKey
+		@return True if the result was loaded.
+		'''
+
+		try:
+			cacheIn = open(self.__cacheName, 'rb')
+		except IOError:
+			return False
+
+		try:
+			try:
+				savedKey = cPickle.load(cacheIn)
+				if savedKey != cacheKey:
+					return False
+				saved = cPickle.load(cacheIn)
+			except Exception, ex:
+				print 'Cache file %s could not be read: %s' % (self.__cacheName, ex)
+				return False
+		finally:
+			cacheIn.close()
+
+		for name in self.__cached:
+			setattr(self, name, saved[name])
+		print 'LOG file read from cache file %s' % self.__cacheName
+		return True
+
+	#------------------------------------------------------------------------------------
+	def __saveCache(self, cacheKey):
+		'''
+		Save the result of reading the LOG file in the cache file. The key is saved first, so it can be checked
+		without loading the rest. If the cache file cannot be written, nothing else happens.
+
+		@param cacheKey See self.__cacheKey
+		'''
+
+		saved = dict()
+		for name in self.__cached:
+			saved[name] = getattr(self, name)
+
+		tmpName = self.__cacheName + '.tmp'
+		try:
+			if not os.path.isdir(cacheDirectory):
+				os.makedirs(cacheDirectory)
+			cacheOut = open(tmpName, 'wb')
+			try:
+				cPickle.dump(cacheKey, cacheOut, cPickle.HIGHEST_PROTOCOL)
+				cPickle.dump(saved, cacheOut, cPickle.HIGHEST_PROTOCOL)
+			finally:
+				cacheOut.close()
+			os.rename(tmpName, self.__cacheName)
+		except (IOError, OSError), ex:
+			print 'Cache file %s could not be written: %s' % (self.__cacheName, ex)
+	#------------------------------------------------------------------------------------
+	def __withNextLine(self, lines):
+		'''
+		Generator that yields each LOG file line together with the line after it (one line lookahead),
+		so the LOG file can be read as a stream. The last line comes with an empty next line.
+
+		@param lines Iterable with the LOG file lines, e.g. the open LOG file.
+		'''
+
+		lastLine = None
+		for line in lines:
+			if lastLine is not None:
+				yield lastLine, line
+			lastLine = line
+
+		if lastLine is not None:
+			yield lastLine, ""
+
+	#------------------------------------------------------------------------------------
+	def __followLines(self, logfIn):
+		'''
+		Generator like self.__withNextLine for a LOG file that is still being written. It starts at the byte
+		self.__offset, where the last reading finished. A line is not read until it is complete (it ends with a line
+		feed) and the last complete line is kept in self.__heldLine until the next reading, because its next line
+		has not been written yet.
+
+		@param logfIn Open LOG file
+		'''
+
+		logfIn.seek(self.__offset)
+		line = self.__heldLine
+		for nextLine in logfIn:
+			if not nextLine.endswith('\n'):		# The FS is still writing this line
+				break
+			self.__offset += len(nextLine)
+			if line is not None:
+				yield line, nextLine
+			line = nextLine
+		self.__heldLine = line
+
+	#------------------------------------------------------------------------------------
+	def update(self):
+		'''
+		Read the lines written in the LOG file since the last reading when the LOG file is followed.
+		The parser state (current setup, temperature variables, scan number, integration start...) is kept
+		between readings, so only the new lines are read. self.logData is updated.
+
+		@return Number of new Tsys calculated.
+		'''
+
+		if not self.__following:
+			return 0
+
+		tsysNum = len(self.__tsys)
+		logfIn = open(self.__fileName, 'r')
+		try:
+			self.__readLog(self.__followLines(logfIn))
+		finally:
+			logfIn.close()
+
+		return len(self.__tsys) - tsysNum
+
+	#------------------------------------------------------------------------------------
+	def finish(self):
+		'''
+		Read the rest of a followed LOG file, when the FS has finished writing it: the held line and a last line
+		without line feed, if any. After that, self.logData is the same as if the whole LOG file had been read at once.
+
+		@return Number of new Tsys calculated.
+		'''
+
+		if not self.__following:
+			return 0
+
+		tsysNum = len(self.__tsys)
+		logfIn = open(self.__fileName, 'r')
+		try:
+			logfIn.seek(self.__offset)
+			lines = logfIn.readlines()
+			if self.__heldLine is not None:
+				lines.insert(0, self.__heldLine)
+			self.__readLog(self.__withNextLine(lines))
+		finally:
+			logfIn.close()
+
+		self.__following = False
+		self.__heldLine = None
+
+		return len(self.__tsys) - tsysNum
+
+	#------------------------------------------------------------------------------------
+	def __readLog(self, logLines):
 		'''
 		Reads the LOG file to find variables. Reading can be divided in two parts: header reading and data reading.
 
@@ -499,49 +1205,43 @@ class logFile:
 			- There are variables that can appear anywhere inside the LOG file, that are named general
 			  variables. These variables should be read in both reading parts.
 
-		As a result, the class variable self.logData will store the DBBC and LO configuration detected, every scan number
-		with the source observed and all tsys calculated with their time tag.
-                '''
+		Every line is classified only once, using the FS record marker after the time tag and the command name
+		that follows it (see self.__classify), and it is passed straight to the handlers of that kind of record.
+
+		The LOG file is read as a stream: only the line being read and the next one are kept, so the memory
+		used does not depend on the size of the LOG file.
 
-                time = [] 	# List of Tsys time tag
-                block = []	# List of Tsys scan tag
-                tsysline = []	# List of calculated Tsys
+		@param logLines Iterable of pairs (line, next line). See self.__withNextLine and self.__followLines
 
-		for nLine in range(0, len(self.fileContent)):
+		As a result, the class variable self.logData will store the DBBC and LO configuration detected, every scan number
+		with the source observed and all tsys calculated with their time tag.
+		'''
 
-			line = self.fileContent[nLine]	# Each iteration reads one LOG file line
+		for line, nextLine in logLines:		# Each iteration reads one LOG file line
 
 			if line.strip() == "":
-				#print "Line number %d is empty." % nLine
 				continue
 
-			#---------------Reading Header Variables------------------
-			# Read the LOG line, check if it is a header line and process it if it is so.
-			# headerComp will tell me if we have already finished reading header variables because
-			# we have already started reading data
+			self.__nextLine = nextLine		# The next line is needed to know if the integration is complete
+
+			#-------------------DBBC Configuration--------------------
+			# The DBBC mode lines have no fixed format, so they are looked for in every line
+			# until the mode is found or we have already started reading data.
 			if not self.__headerComp:
-				if self.__readHeader(line):
+				if self.__readRack(line):
 					continue
 
-			#---------------Reading General Variables-----------------
-			# Check if the LOG line has information about general variables.
-			# General variables can appear anywhere inside the LOG file.
-			if self.__getGenVar(line):
-				continue
-
-			#----------------Checking Data Validation-----------------
-			# Check if the LOG line is "data_valid=on/off".
-			if self.__checkDataValid(line):
+			#-----------Reading Header, General and Temp Variables-----------
+			# The handlers registered for this kind of line are called in order
+			# until one of them uses the line.
+			used = False
+			for handler in self.__classify(line):
+				if handler(line):
+					used = True
+					break
+			if used:
 				continue
 
-			#----------------Reading Temp Variables-------------------
-			# If data is valid, check if the LOG line has temperature information.
-			if self.__dataValid:
-				if nLine+1 >= len(self.fileContent):
-					self.__readTempVar(line, "")
-				else:
-					self.__readTempVar(line, self.fileContent[nLine+1].strip())
-
 			#--------Integration Complete. Tsys calculation-----------
 			# If a "data_valid=off" is read or the integration time has been exceeded (20 seconds),
 			# we suppose that the integration is complete. Using temperature variables stored, Tsys
@@ -551,11 +1251,11 @@ class logFile:
 				if not self.__currentSetup in self.__bbccodelist:
 				    continue
                                 # if we can't decode time stamp, it is invalid line
-				dt = self.__getDatetime(line)
-                                if not dt:
+				lineTime = self.__getTime(line)
+                                if lineTime is None:
 	                                continue
 
-				tsysline_aux = self.__getTsys(self.__bbccodelist[self.__currentSetup], dt)
+				tsysline_aux = self.__getTsys(self.__bbccodelist[self.__currentSetup], lineTime)
 
 				"""
 				if not tsysline_aux:	# If is empty means that some temperature variable was empty during Tsys calculation.
@@ -585,21 +1285,10 @@ class logFile:
 				"""
 
 				if tsysline_aux and (not all(-1 == tsys for tsys in tsysline_aux)):
-					# Tsys time tag
-					dt = self.__getDatetime(line)
-					# If we cannot get the timestamp, skip line
-					if not dt:
-						continue
-					total_seconds = (dt - self.__epoch).total_seconds()
-					time.append(total_seconds)
+					# Tsys with its time and scan tags
+					self.__tsys.append(self.__currentSetup, lineTime / 1e6, self.__scanNum, tsysline_aux)
 					#days = (dt - datetime.datetime(dt.year,1,1,dt.hour,dt.minute,dt.second,dt.microsecond)).days + 1
 					#time.append(days + (dt.hour/24.) + (dt.minute/(60.*24.)) + (dt.second/(3600.*24.)) + (dt.microsecond/(3600.*24.*1e6)))
-
-					# Tsys scan tag
-					block.append(self.__scanNum)
-
-					# Tsys calculated
-					tsysline.append(tsysline_aux)
 				"""
 
 				# Tsys time tag
@@ -617,10 +1306,25 @@ class logFile:
 				self.__intComplete = False
 
 		# When the LOG file has been read, we fill the header using the variables read.
+		# If the LOG file is followed, the header is filled again after every reading.
 		self.__fillHeader()
 
 		# All variables read and calculated are stored in self.logData class variable.
-		self.logData = [self.__header,self.__indexline,self.__scanline,tsysline,block,time, self.__tsyslog, self.__setupTime]
+		# Tsys are stored in a tsysTable. Their scan and time tags are arrays.
+		self.scans = self.__scanTable()
+		self.logData = [self.__header,self.__indexline,scan_comments(self.scans)[0],self.__tsys,self.__tsys.scan(),self.__tsys.time(), self.__tsyslog, self.__setupTime]
+
+	#------------------------------------------------------------------------------------
+	def __scanTable(self):
+		'''Returns the scans read as a NumPy structured array. See self.__scanFields.
+		'''
+
+		fields = []
+		for i, (name, kind) in enumerate(self.__scanFields):
+			if kind == 'S':
+				kind = 'S%d' % max([1] + [len(scan[i]) for scan in self.__scans])
+			fields.append((name, kind))
+		return np.array(self.__scans, dtype=fields)
 
 	#------------------------------------------------------------------------------------
 	def __fillHeader(self):
@@ -647,16 +1351,24 @@ class logFile:
 
 		ind_off = 0
 
+		# The header can be filled more than once if the LOG file is followed.
+		self.__header = []
+		self.__indexline = []
+		self.channels = []
+		self.__tsyslog = []
+
 		# Make an ANTAB header for each band in the LOG file.
 		for bP in range(len(self.__setupTime)):
 			setup = self.__setupTime[bP][1]
 			colnum = 1
 			polNum = {'L':1, 'R':1}
-			headerStr = "!\n! Setup %s\n! Calibration mode: %s\n!\n" % (setup,self.calModeName[setup])
+			headerStr = "!\n! Setup %s\n! Calibration mode: %s\n!\n" % (setup,self.calModeName.get(setup))
 			indexStr = "INDEX= "
+			channels = []
 			if setup not in self.__bbccodelist:
 				self.__header.append(headerStr[:-1])
 				self.__indexline.append(indexStr + '\n')
+				self.channels.append(np.array(channels, dtype=self.__channelType))
 				continue
 			for i in self.__bbccodelist[setup]:
 				lofq = self.freqLOMHzArray[setup][self.__whichif[setup][i]][-1] # Get LO frequency, polarization and bandwidth for every DBBC channel
@@ -695,8 +1407,11 @@ class logFile:
 				#	tcal = self.__setupTcal[setup][i]
 				tcal = self.__setupTcal[setup][i][0]
 
+				# Channel as written in the header
+				channel = ('%s%d' % (pol[0].upper(),polNum[pol[0].upper()]), self.__whichif[setup][i].upper(), bbcnum, float('%.2f' % fchan), sbLetter, float('%04.2f' % self.__bw[setup][i]), float('%.2f' % tcal), pol)
+				channels.append(channel)
 				# Header string format
-				headerStr += '!Column %d = %s%d: if%s, bbc%02d, %.2f MHz , %sSB, BW= %04.2f MHz, Tcal=%.2f K\n'%(colnum,pol[0].upper(),polNum[pol[0].upper()],self.__whichif[setup][i].upper(),bbcnum,fchan,sbLetter,self.__bw[setup][i],tcal)
+				headerStr += '!Column %d = %s: if%s, bbc%02d, %.2f MHz , %sSB, BW= %04.2f MHz, Tcal=%.2f K\n'%((colnum,)+channel[:-1])
 				# Index string format
 				indexStr += "'%s%d'," % (pol[0].upper(), polNum[pol[0].upper()])
                			colnum += 1
@@ -705,26 +1420,21 @@ class logFile:
 			indexStr = indexStr.strip(',') 		# Removes the last comma
 			self.__header.append(headerStr[:-1])	# Take all header string except the last line feed character
 			self.__indexline.append(indexStr + '\n')
+			self.channels.append(np.array(channels, dtype=self.__channelType))
 
 
 		#----------------Tsys from the LOG file-------------------
 
-		#print self.__tsyslogDict
-		sortedKeys = sorted(self.__tsyslogDict)		# Sort the Tsys read from the LOG file by their time tag
-
-		for i in sortedKeys:
-			tsyslog = [i] 			# Store Tsys time tag (index 0)
-			auxDict = self.__tsyslogDict[i]
-			for j in self.__bbccodelist[self.__currentSetup]:
-				try:
-					tsyslog_aux = auxDict[j]
-					tsyslogMean = sum(tsyslog_aux)/len(tsyslog_aux) # Calculate Tsys for each DBBC channel
-				except:
-					tsyslogMean = -1
-
-				tsyslog.append(tsyslogMean) # Store Tsys dict (index 1)
+		times, means, counts = self.__tsyslogMeans()	# Tsys for each DBBC channel, sorted by their time tag
+		if self.__following and not self.__currentSetup in self.__bbccodelist:
+			times = []				# A followed LOG file may have no setup with data yet
 
-			self.__tsyslog.append(tsyslog) # Store Tsys dict with its time tag
+		if len(times) > 0:
+			columns = [self.__tsyslogColumns.get(j, -1) for j in self.__bbccodelist[self.__currentSetup]]
+			means = np.column_stack((means, np.zeros(len(times))))		# Last column: DBBC channel not found (-1)
+			counts = np.column_stack((counts, np.zeros(len(times), dtype=int)))
+			tsyslog = np.where(counts[:, columns] > 0, means[:, columns], -1)
+			self.__tsyslog = np.column_stack((times, tsyslog)).tolist()	# Store Tsys with its time tag (index 0)
 
 
 
@@ -752,6 +1462,11 @@ class logFile:
 					self.__caltempRead[self.__currentSetup] = False
 				if len(self.__tempDict) < 5:
 	                                self.__tempDict = [dict()] + self.__tempDict
+					self.__sumTpicd()
+					self.__tpicdSum[:, 1] = self.__tpicdSum[:, 0]	# The running sums are shifted as the dictionaries
+					self.__tpicdCount[:, 1] = self.__tpicdCount[:, 0]
+					self.__resetTpicd([0])
+				self.__resolveTpicd()
 
 			if self.dbbcModeName == "PFB":								# If the DBBC uses PFB mode:
 				self.__bbccodelist[self.__currentSetup] = self.__vsiCh[self.__currentSetup][0] + self.__vsiCh[self.__currentSetup][1]	# 	self.__bbccodelist should be fill with self.__vsiCh content
@@ -807,6 +1522,7 @@ class logFile:
 			self.__bbccodelist[self.__currentSetup].sort()
 			#if self.calModeName[self.__currentSetup] == 'CONT':				# If the DBBC uses CONTINUOUS calibration mode:
 
+			lofqs, pols, fchans = [], [], []
 			for i in self.__bbccodelist[self.__currentSetup]:			#	Tcal of every DBBC channel should be got from RXG files
 				lofq = self.freqLOMHzArray[self.__currentSetup][self.__whichif[self.__currentSetup][i]][-1]
 				pol = self.polArray[self.__currentSetup][self.__whichif[self.__currentSetup][i]][-1]
@@ -820,8 +1536,12 @@ class logFile:
 					bbcFreq = self.__bbcfq[self.__currentSetup][i]
 
 				fchan=lofq+bbcFreq-bw_aux/2.
-				tcal=get_tcal(lofq,pol,fchan, self.station().lower())
+				lofqs.append(lofq)
+				pols.append(pol)
+				fchans.append(fchan)
+			tcals = get_tcals(lofqs, pols, fchans, self.station().lower())
 
+			for i, tcal in zip(self.__bbccodelist[self.__currentSetup], tcals):
 				if not self.__caltempRead[self.__currentSetup]:
 					self.__tempDict[-1][i] = [tcal]
 					self.__setupTcal[self.__currentSetup][i] = [tcal]
@@ -832,7 +1552,7 @@ class logFile:
 				self.__tempDict[-1][i] = self.__setupTcal[self.__currentSetup][i]
 
 	#------------------------------------------------------------------------------------
-	def __readTempVar(self, line, nextLine):
+	def __readTempVar(self, line):
 		"""
 		Read 'tpicd' temperature variable from the LOG file.
 		At the beginning, this method check two strings to detect if DBBC uses
@@ -840,12 +1560,17 @@ class logFile:
 		just use the string corresponding to the detected mode.
 
 		To determine if the integration time has been exceeded, this method compare the
-		dates of the checked line and the next line.
+		dates of the checked line and the next line (self.__nextLine).
+
+		Temperature variables are only read if data is valid. The line is never used up here,
+		because the Tsys calculation has to be done with it when the integration is complete.
 
 		@param line Line to check
-		@param nextLine The next line of the line to check
 		"""
 
+		if not self.__dataValid:
+			return False
+
 		if self.calModeName[self.__currentSetup] == "CONT":					# If the DBBC uses CONTINUOUS calibration mode, check the line with "#tpicd#tpcont/"
 			tempReference = ['#tpicd#tpcont/']
 		elif self.calModeName[self.__currentSetup] == "SINGLE":				# If the DBBC uses SINGLE calibration mode, check the line with "#tpicd#tpi/"
@@ -861,20 +1586,23 @@ class logFile:
 				self.__setParams()								#	Call self.__setParams() method to prepare the variables used to store temperature information
 				self.__headerComp = True							# 	Set self.__headerComp to True, indicating that header reading has finished
 
-			dt = self.__getDatetime(line)
-			if nextLine == "":
-				dt_nextLine = dt + datetime.timedelta(0,0,0,200)
-			else:
-				dt_nextLine = self.__getDatetime(nextLine)
-			if (dt-self.__dtStartInt)>= self.__intTime and (dt_nextLine-dt)>datetime.timedelta(0,0,0,100): # Compare the checked line date and the next line date. If the integration time
+			lineTime = self.__getTime(line)
+			nextLineTime = None
+			if self.__nextLine.strip() != "":
+				nextLineTime = self.__getTime(self.__nextLine)
+			if nextLineTime is None:
+				nextLineTime = lineTime + 200000
+			if (lineTime-self.__startInt)>= self.__intTime and (nextLineTime-lineTime)>100000: # Compare the checked line date and the next line date. If the integration time
 				self.__intComplete = True				  # has been exceeded, set self.__intComplete to True and store the date when the integration
-				self.__dtStartInt = dt					  # finished.
+				self.__startInt = lineTime				  # finished.
 
 			if tempInd == 0:						  # Only store temperature information if tempInd == 0, because it means that a reference string
 				pass							  # was found in the checked line.
 			else:
 				self.__getTempLine(line, tempInd)
 
+		return False
+
 	#------------------------------------------------------------------------------------
 	def __checkDataValid(self, line):
 		"""
@@ -892,7 +1620,7 @@ class logFile:
                	elif idIndex == 1:
 			if not self.__currentSetup == None:
 	                       	self.__dataValid = True
-	                       	self.__dtStartInt = self.__getDatetime(line)
+	                       	self.__startInt = self.__getTime(line)
 				if self.__newSetup:
 					self.__setParams()
 				self.__newSetup = False
@@ -909,56 +1637,182 @@ class logFile:
 		return False
 
 	#------------------------------------------------------------------------------------
-	def __getGenVar(self, line):
+	def __classify(self, line):
 		"""
-		Read a LOG file line to check if there are general variables.
-		General variables are variables that can appear anywhere inside the LOG file.
-		These variables are:
-			- Scan name/number
-			- Source to observe
-			- LO configuration
-			- Tsys printed inside the LOG file
-			- In SINGLE calibration mode: tpiprime, tpical and caltemp can appear anywhere inside the LOG file, even if data is not valid.
+		Classify a LOG file line using the FS record marker after the time tag and the name of the command
+		that follows it, and return the handlers that must check that kind of line, in order:
+
+			"2017.067.01:06:11.50&setup03/cont_cal=off"	-> ('&', 'setup03', 'cont_cal')
+			"2017.067.01:06:12.50:scan_name=no0001,..."	-> (':', 'scan_name', None)
+			"2017.067.01:06:13.50#tpicd#tpcont/1l,..."	-> ('#', 'tpicd#tpcont', None)
+
+		The handlers of every kind of record are worked out only the first time that it is found (see self.__handlersFor).
+		Lines without a known record marker have no handlers.
+
+		@param line Line to check
+		"""
+
+		recordMatch = self.__recordRe.match(line)
+		if recordMatch is None:
+			return ()
+
+		marker, name, command = recordMatch.groups()
+		if marker != '&':		# Only procedure lines have a command after the slash: "&ifdab/lo=loa,..."
+			command = None
+		elif command is None:
+			command = ''
+
+		recordKey = (marker, name, command)
+		if not recordKey in self.__dispatch:
+			self.__dispatch[recordKey] = self.__handlersFor(marker, name, command)
+
+		return self.__dispatch[recordKey]
+
+	#------------------------------------------------------------------------------------
+	def __handlersFor(self, marker, name, command):
+		"""
+		Return the list of handlers for one kind of LOG record. The handlers keep the order in which the
+		variables were always checked, because some of them do not use up the line and let the next ones check it:
+
+			- Procedure lines ("&proc/command=..."): format, DBBC channels, setup, IF distributor, recorder mode,
+			  calibration mode, LOs, tpical and data valid.
+			- Schedule and operator lines (":command=..." and ";command=..."): scan name, source, setup,
+			  recorder mode and data valid.
+			- Responses ("/name/..." and "#device#name/..."): temperature variables and Tsys printed in the LOG file.
+
+		@param marker FS record marker: '&', ':', ';', '/' or '#'
+		@param name Name of the procedure, command or response
+		@param command Command inside the procedure ('&' lines only)
+		"""
+
+		handlers = []
+
+		if marker == '&':
+			if command == 'form':
+				handlers.append(self.__readForm)
+			if command in ['vsi1', 'vsi2']:
+				handlers.append(self.__readVsi)
+			if name.startswith('dbbc'):
+				handlers.append(self.__readBbc)
+			if command.startswith('setup'):
+				handlers.append(self.__readSetup)
+			if name.startswith('setup'):
+				handlers.append(self.__readIfd)
+			if command.endswith('_mode'):
+				handlers.append(self.__readRecMode)
+			if name.startswith('setup') and command == 'cont_cal':
+				handlers.append(self.__readCalMode)
+			if command == 'lo':
+				handlers.append(self.__readLO)
+			if command.startswith('tpical'):
+				handlers.append(self.__readCalVar)
+			if command == 'data_valid':
+				handlers.append(self.__checkDataValid)
+
+		elif marker in [':', ';']:
+			if marker == ':' and name == 'scan_name':
+				handlers.append(self.__readScanName)
+			if marker == ':' and name == 'source':
+				handlers.append(self.__readSource)
+			if name.startswith('setup'):
+				handlers.append(self.__readSetup)
+			if name.endswith('_mode'):
+				handlers.append(self.__readRecMode)
+			if name == 'data_valid':
+				handlers.append(self.__checkDataValid)
+
+		elif marker == '/':
+			if name in ['tpi', 'tpdiff', 'caltemp', 'tsys'] or name.startswith('tpical'):
+				handlers.append(self.__readCalVar)
+
+		elif marker == '#':
+			if name == 'tpicd#tsys':
+				handlers.append(self.__readCalVar)
+			elif name in ['tpicd#tpcont', 'tpicd#tpi']:
+				handlers.append(self.__readTempVar)
+
+		return tuple(handlers)
+
+	#------------------------------------------------------------------------------------
+	def __readVsi(self, line):
+		"""
+		If DBBC uses PFB mode, read the DBBC channels used in the observation.
+			"&setup01/vsi1=a05,a06,a07,a08,a09,a10,a11,a12,b05,b06,b07,b08,b09,b10,b11,b12"
 
 		@param line Line to check
 		"""
 
-		# If DBBC configuration mode was found, look for the DBBC channels used in the observation
 		if self.dbbcModeName == "PFB":
 			vsiNum = self.__idLine(line, ['/vsi1=', '/vsi2='])
-                        if vsiNum != 0:						  # When DBBC uses PFB mode:
-				auxStr = line.split('=')			  # "&setup01/vsi1=a05,a06,a07,a08,a09,a10,a11,a12,b05,b06,b07,b08,b09,b10,b11,b12"
+			if vsiNum != 0:
+				auxStr = line.split('=')
 				if not self.__currentSetup in self.__vsiCh:
 					self.__vsiCh[self.__currentSetup] = [[],[]]
 				self.__vsiCh[self.__currentSetup][vsiNum-1] = auxStr[1].split('\n')[0].split(',')
 				return True
 
-                elif self.dbbcModeName == "DDC":
-                	if self.__idLine(line,['&dbbc']) and not self.__idLine(line,['/if=bbc']):			  # When DBBC uses DDC mode:
-				#print line
-				auxStr=line.split('/')[1].split('=')		  # "&dbbc01d/bbc01=638.49,a,16.00"
+		return False
+
+	#------------------------------------------------------------------------------------
+	def __readBbc(self, line):
+		"""
+		If DBBC uses DDC mode, read the configuration of the DBBC channels used in the observation.
+			"&dbbc01d/bbc01=638.49,a,16.00"
+
+		@param line Line to check
+		"""
+
+		if self.dbbcModeName == "DDC":
+			if self.__idLine(line,['&dbbc']) and not self.__idLine(line,['/if=bbc']):
+				auxStr=line.split('/')[1].split('=')
 				bbcstr=auxStr[0]
-                                bbcsplt=auxStr[1].split(',')
+				bbcsplt=auxStr[1].split(',')
 				if not self.__currentSetup in self.__bbcinfo:
 					self.__bbcinfo[self.__currentSetup] = []
 				self.__bbcinfo[self.__currentSetup].append([bbcstr,bbcsplt[0],bbcsplt[1],bbcsplt[2]]) # self.__bbcinfo: [['bbc01', '638.49', 'a', '16.00'],[...]]
 				return True									      #			   chID     Freq     chIF  bandwidth
 
+		return False
+
+	#------------------------------------------------------------------------------------
+	def __readScanName(self, line):
+		"""
+		Read the scan name and increase the scan number.
+
+		@param line Line to check
+		"""
+
 		if self.__idLine(line,[':scan_name=']):
-                	self.__scanName = scan_aux=line.split('=')[1].split(',')[0]	# The scan name usually corresponds with the scan number, but not always.
-                        self.__scanNum += 1						# For this reason, the scan name and the scan number are separated in different variables.
+			self.__scanName = line.split('=')[1].split(',')[0]	# The scan name usually corresponds with the scan number, but not always.
+			self.__scanNum += 1					# For this reason, the scan name and the scan number are separated in different variables.
+			return True
 
-                        return True
+		return False
+
+	#------------------------------------------------------------------------------------
+	def __readSource(self, line):
+		"""
+		When source string reference is found, a new scan line is made to write scan information inside ANTAB file.
+		This line is usually the next line to a scan name line.
 
-                if self.__idLine(line,[':source=']):					# When source string reference is found, a new scan line is made to write scan information inside ANTAB file.
-                        dt = self.__getDatetime(line)					# This line is usually the next line to a scan name line.
-                        days = (dt - datetime.datetime(dt.year,1,1,dt.hour,dt.minute,dt.second,dt.microsecond)).days + 1
-                        sourceName = line.split('=')[1].split(',')[0]
-                        strLine=('\n! %03d %02d:%05.2f: scanNum=%04d scanName=%s source=%s'%(days,dt.hour,dt.minute + (dt.second/60.) + (dt.microsecond/(60.*float(1e6))),self.__scanNum, self.__scanName,sourceName))
-                        self.__scanline.append(strLine)
-                        return True
+		@param line Line to check
+		"""
 
-		#-----------------------Current Setup-------------------------
+		if self.__idLine(line,[':source=']):
+			sourceName = line.split('=')[1].split(',')[0]
+			self.__scans.append((self.__scanNum, str(self.__scanName), sourceName, self.__getTime(line) / 1e6))
+			return True
+
+		return False
+
+	#------------------------------------------------------------------------------------
+	def __readSetup(self, line):
+		"""
+		Read the current setup. The line is only used up if the setup has changed.
+			":setup01", ";setup01" or "&proc/setup01"
+
+		@param line Line to check
+		"""
 
 		if self.__idLine(line, [':setup',';setup','/setup']):
 			self.__currentSetup = line.split('p')[-1].strip()
@@ -968,11 +1822,7 @@ class logFile:
 				self.__caltempRead[self.__currentSetup] = False
 
 			if self.__currentSetup != self.__lastSetup:
-				dt = self.__getDatetime(line)
-				time_aux =  (dt - self.__epoch).total_seconds()
-				#days = (dt - datetime.datetime(dt.year,1,1,dt.hour,dt.minute,dt.second,dt.microsecond)).days + 1
-				#time_aux = days + (dt.hour/24.) + (dt.minute/(60.*24.)) + (dt.second/(3600.*24.)) + (dt.microsecond/(3600.*24.*1e6))
-                                self.__setupTime.append([time_aux,self.__currentSetup])
+				self.__setupTime.append([self.__getTime(line) / 1e6,self.__currentSetup])
 				self.__lastSetup = self.__currentSetup
 				self.__newSetup = True
 
@@ -981,34 +1831,63 @@ class logFile:
 						self.__tempDict = [dict(),dict(),dict(),dict()]
 					elif self.calModeName[self.__currentSetup] == 'CONT':
 						self.__tempDict = [dict(),dict(),dict()]
+					self.__resetTpicd([0, 1])
 
 				return True
 
-		if self.__idLine(line, ['&setup']):
+		return False
+
+	#------------------------------------------------------------------------------------
+	def __readIfd(self, line):
+		"""
+		Read the IF distributor used by each setup. The line is never used up here.
+			"&setup01/ifdab"
+
+		@param line Line to check
+		"""
 
+		if self.__idLine(line, ['&setup']):
 			auxStr = line.split('&')[1].split('/')
 			curSetup = auxStr[0].split('setup')[1]
 			if "ifd" in auxStr[1]:
 				if not curSetup in self.ifdSetup:
 					self.ifdSetup[curSetup] = auxStr[1].strip()
 
-		#------------------------Fila10G Mode-------------------------
+		return False
+
+	#------------------------------------------------------------------------------------
+	def __readRecMode(self, line):
+		"""
+		Read the Fila10G or recorder mode, whose mask tells which BBCs are recorded. The line is never used up here.
+			"&setup01/fila10g_mode=0xffffffff,0x0000ffff" or "&setup01/mk5c_mode=vdif,0xffffffff,,16"
+
+		@param line Line to check
+		"""
+
 		if self.__idLine(line, ['/fila10g_mode=']):
 			tmpLine = line.split('=')[1]
 			# remove starting 0x prefix
 			mask1 = tmpLine.split(',')[0][2:]
 			mask2 = tmpLine.split(',')[1][2:]
 			mask = ''.join(['0x',mask2,mask1])
-			#self.__fila10gMode[self.__currentSetup] = int(line.split(',')[1],16)
 			self.__fila10gMode[self.__currentSetup] = int(mask,16)
 		elif self.__idLine(line, ['_mode=']):
 			self.__recMode[self.__currentSetup] = int(line.split(',')[1],16)
 
-		#----------------------Calibration Mode-----------------------
+		return False
+
+	#------------------------------------------------------------------------------------
+	def __readCalMode(self, line):
+		"""
+		Read the calibration mode of the current setup.
+			"2017.067.01:06:11.50&setup03/cont_cal=off"
+
+		@param line Line to check
+		"""
 
 		if self.__idLine(line, ['/cont_cal=']) and self.__idLine(line, ['&setup']):
 
-			auxStr = line.split('=')[1].split(',')					# 2017.067.01:06:11.50&setup03/cont_cal=off
+			auxStr = line.split('=')[1].split(',')
 			if auxStr[0].strip() == 'off':
 				self.calModeName[self.__currentSetup] = 'SINGLE'
 			elif auxStr[0].strip() == 'on':
@@ -1020,20 +1899,31 @@ class logFile:
 					self.__tempDict = [dict(),dict(),dict(),dict(), dict()]
 				elif self.calModeName[self.__currentSetup] == 'CONT':
 					self.__tempDict = [dict(),dict(),dict(), dict()]
+				self.__resetTpicd([0, 1])
+			self.__resolveTpicd()
 
 			return True
 
-		#---------------------LO Configuration------------------------
-		# Get LOs frequency and polarization.
-                loReference = ["/lo=loa", "/lo=lob", "/lo=loc", "/lo=lod"]
+		return False
+
+	#------------------------------------------------------------------------------------
+	def __readLO(self, line):
+		"""
+		Read LOs frequency, sideband and polarization.
+			"&ifdab/lo=loa,42500.00,usb,rcp,1.000"
+
+		@param line Line to check
+		"""
+
+		loReference = ["/lo=loa", "/lo=lob", "/lo=loc", "/lo=lod"]
 
-                if self.__idLine(line, loReference):						# Line to check:
+		if self.__idLine(line, loReference):
 			ifID = line.split('&')[1].split("/")[0]
 
 			if ifID != self.ifdSetup[self.__currentSetup]:
 				return True
 
-                        auxStr = line.split(',')						#	"lo=loa,42500.00,usb,rcp,1.000"
+			auxStr = line.split(',')						#	"lo=loa,42500.00,usb,rcp,1.000"
 			ifsel = auxStr[0][-1]							# 	ifsel = 'a'
 
 			if (self.__currentSetup in self.freqLOMHzArray):
@@ -1072,57 +1962,41 @@ class logFile:
 
 			if fill:								# The program stored the pair of frequency and polarization.
 				freqAux.append(newFreq)
-                        	polAux.append(newPol)
+				polAux.append(newPol)
 				bandAux.append(newBand)
 				self.freqLOMHzArray[self.__currentSetup][ifsel] = freqAux
 				self.polArray[self.__currentSetup][ifsel] = polAux
 				self.bandArray[self.__currentSetup][ifsel] = bandAux
 
-                        return True
+			return True
 
-		if self.__currentSetup in self.calModeName:
+		return False
 
-	                if self.calModeName[self.__currentSetup] == "SINGLE":		# If the DBBC uses SINGLE calibration mode,
-	                        auxReference = ['/tpi/', '/tpical', '/tpdiff/', '/caltemp/']	# check the LOG file line to look for tpiprime, tpical and caltemp temperature variables.
-	                        tempInd = self.__idLine(line,auxReference)
+	#------------------------------------------------------------------------------------
+	def __readCalVar(self, line):
+		"""
+		Read the temperature variables that can appear anywhere inside the LOG file, even if data is not valid,
+		and the Tsys printed inside the LOG file:
+			- In SINGLE calibration mode: tpiprime, tpical, tpidiff, caltemp and "/tsys/" lines.
+			- In CONTINUOUS calibration mode: caltemp and "#tpicd#tsys/" lines.
+			- If the calibration mode is not known yet: tpiprime, tpical and caltemp.
 
-	                        if tempInd != 0:					# If any temperature variable was found, store it in its dictionary.
-		                	tempInd += 1					# If SINGLE calibration mode was identified, increase temperature index in one.
-	                	        self.__getTempLine(line, tempInd)		# At the beginning     -> tempDict: [tpiprime, tpical, caltemp]
-	                                return True					# SINGLE cal detected  -> tempDict: [tpicd, tpiprime, tpical, caltemp]
+		@param line Line to check
+		"""
 
-	                        elif self.__idLine(line, ['/tsys/']):			# If no temperature variable was found, check the LOG file line to look for Tsys printed inside the LOG file.
-											# 	"/tsys/1l,130.8,1u,130.8,3l,130.8,3u,131.0,ia,145.5"
-					dt = self.__getDatetime(line)			#       time_aux: Time tag of the checked line
-					time_aux =  (dt - self.__epoch).total_seconds()
+		if self.__currentSetup in self.calModeName:
 
-					#days = (dt - datetime.datetime(dt.year,1,1,dt.hour,dt.minute,dt.second,dt.microsecond)).days + 1
-					#time_aux = days + (dt.hour/24.) + (dt.minute/(60.*24.)) + (dt.second/(3600.*24.)) + (dt.microsecond/(3600.*24.*1e6))
-					auxStr = line.split('/')[-1].split(',')
-
-					if not time_aux in self.__tsyslogDict:
-						self.__tsyslogDict[time_aux] = dict()
-
-					auxDict = self.__tsyslogDict[time_aux]
-
-					for i in range(0,len(auxStr),2):
-						dictExist = False
-	                        		if (auxStr[i] in auxDict):
-	                                		dictExist = True
-						for element in self.__chId:
-	                                		if element==auxStr[i][self.__chIdIndex]:
-								if dictExist:
-	                                               			try:
-	                                                       			auxDict[auxStr[i]].append(float(auxStr[i+1]))
-									except:
-										auxDict[auxStr[i]].append(-1)
-								else:
-									try:
-										auxDict[auxStr[i]] = [float(auxStr[i+1])]
-									except:
-										auxDict[auxStr[i]] = [-1]
-
-					self.__tsyslogDict[time_aux] = auxDict	# self.__tsyslogDict = [ time_aux : [ '1l' : [130.8], '1u' : [130.8], '3l' : [130.8], '3u' : [131.0] ], ... ]
+			if self.calModeName[self.__currentSetup] == "SINGLE":		# If the DBBC uses SINGLE calibration mode,
+				auxReference = ['/tpi/', '/tpical', '/tpdiff/', '/caltemp/']	# check the LOG file line to look for tpiprime, tpical and caltemp temperature variables.
+				tempInd = self.__idLine(line,auxReference)
+
+				if tempInd != 0:					# If any temperature variable was found, store it in its dictionary.
+					tempInd += 1					# If SINGLE calibration mode was identified, increase temperature index in one.
+					self.__getTempLine(line, tempInd)		# At the beginning     -> tempDict: [tpiprime, tpical, caltemp]
+					return True					# SINGLE cal detected  -> tempDict: [tpicd, tpiprime, tpical, caltemp]
+
+				elif self.__idLine(line, ['/tsys/']):			# If no temperature variable was found, check the LOG file line to look for Tsys printed inside the LOG file.
+					self.__getTsysLog(line)				# 	"/tsys/1l,130.8,1u,130.8,3l,130.8,3u,131.0,ia,145.5"
 					return True
 
 			else:
@@ -1131,36 +2005,8 @@ class logFile:
 					return True
 											# If the DBBC uses CONTINUOUS calibration mode, check the LOG file line to look for Tsys printed inside the LOG file.
 				elif self.__idLine(line, ['#tpicd#tsys/']):		# 	"#tpicd#tsys/1l,46.3,1u,49.5"
-					dt = self.__getDatetime(line)			#	time_aux: Time tag of the checked line
-					time_aux =  (dt - self.__epoch).total_seconds()
-	                                #days = (dt - datetime.datetime(dt.year,1,1,dt.hour,dt.minute,dt.second,dt.microsecond)).days + 1
-	                                #time_aux = days + (dt.hour/24.) + (dt.minute/(60.*24.)) + (dt.second/(3600.*24.)) + (dt.microsecond/(3600.*24.*1e6))
-	                                auxStr = line.split('/')[-1].split(',')
-
-					if not time_aux in self.__tsyslogDict:
-		                                self.__tsyslogDict[time_aux] = dict()
-
-	                                auxDict = self.__tsyslogDict[time_aux]
-
-	                                for i in range(0,len(auxStr),2):
-		                                dictExist = False
-	                                        if (auxStr[i] in auxDict):
-		                                        dictExist = True
-	                                        for element in self.__chId:
-							if element==auxStr[i][self.__chIdIndex]:
-		                                                if dictExist:
-		                                                        try:
-		                                                                auxDict[auxStr[i]].append(float(auxStr[i+1]))
-	                                                                except:
-		                                                                auxDict[auxStr[i]].append(-1)
-	                                                        else:
-	                                                                try:
-	                                                                        auxDict[auxStr[i]] = [float(auxStr[i+1])]
-	                                                                except:
-	                                                                        auxDict[auxStr[i]] = [-1]
-
-	                                self.__tsyslogDict[time_aux] = auxDict		# self.__tsyslogDict = [ time_aux : [ '1l' : [46.3], '1u' : [49.5] ], ... ]
-	                                return True
+					self.__getTsysLog(line)
+					return True
 		else:
 			auxReference = ['/tpi/', '/tpical', '/caltemp/']
 			tempInd = self.__idLine(line,auxReference)
@@ -1169,121 +2015,392 @@ class logFile:
 				self.__getTempLine(line, tempInd)
 				return True
 
-
 		return False
 
 	#------------------------------------------------------------------------------------
-	def __getTsys(self, bbccodelist, dt):
+	def __getTsysLog(self, line):
+		"""
+		Keep the Tsys printed inside the LOG file with its time tag:
+			"/tsys/1l,130.8,1u,130.8,3l,130.8,3u,131.0,ia,145.5" or "#tpicd#tsys/1l,46.3,1u,49.5"
+		The lines are read in blocks by self.__readTsysLog.
+
+		@param line Checked line
+		"""
+
+		lineTime = self.__getTime(line)			# lineTime: Time tag of the checked line
+		if lineTime is None:
+			return
+
+		auxStr = line.split('/')[-1].split(',')
+		key = (len(auxStr), tuple(auxStr[0::2]))	# The list of DBBC channels repeats from line to line
+		if not key in self.__tsyslogLayouts:
+			self.__tsyslogLayouts[key] = self.__tsyslogLayout(auxStr)
+
+		self.__tsyslogPending.append((lineTime, self.__tsyslogLayouts[key], auxStr))
+		if len(self.__tsyslogPending) == 4096:
+			self.__readTsysLog()
+
+	#------------------------------------------------------------------------------------
+	def __tsyslogLayout(self, auxStr):
+		'''
+		Columns of the DBBC channels of a Tsys line in the Tsys table (see self.__tsyslogMeans) and getter of their values.
+
+		@param auxStr Fields of the Tsys line after '/'.
+		'''
+
+		columns = []
+		fields = []
+		for i in range(0, len(auxStr), 2):
+			if auxStr[i][self.__chIdIndex] in self.__chId:
+				if not auxStr[i] in self.__tsyslogColumns:
+					self.__tsyslogColumns[auxStr[i]] = len(self.__tsyslogColumns)
+				columns.append(self.__tsyslogColumns[auxStr[i]])
+				fields.append(i + 1)
+		if len(fields) == 0:
+			values = lambda auxStr: ()
+		elif len(fields) == 1:
+			values = lambda auxStr: (auxStr[fields[0]],)
+		else:
+			values = operator.itemgetter(*fields)
+		return columns, values, len(auxStr) % 2 == 1
+
+	#------------------------------------------------------------------------------------
+	def __readTsysLog(self):
+		'''
+		Read the values of the pending Tsys lines (see self.__getTsysLog) all together and keep them
+		as arrays in self.__tsyslogBlocks. A value that cannot be read counts as -1.
+		'''
+
+		if not self.__tsyslogPending:
+			return
+		pending = self.__tsyslogPending
+		self.__tsyslogPending = []
+
+		lines = []
+		columns = []
+		strings = []
+		for n in range(len(pending)):
+			lineTime, layout, auxStr = pending[n]
+			if layout[2]:						# The last DBBC channel has no value
+				auxStr = auxStr + ['-1']
+			lines += [n] * len(layout[0])
+			columns += layout[0]
+			strings += layout[1](auxStr)
+
+		try:
+			values = np.array(strings, dtype=float)
+		except:
+			values = []
+			for string in strings:
+				try:
+					values.append(float(string))
+				except:
+					values.append(-1)
+			values = np.array(values, dtype=float)
+
+		times = np.array([lineTime for lineTime, layout, auxStr in pending], dtype=np.int64)
+		self.__tsyslogBlocks.append((times, np.array(lines, dtype=int), np.array(columns, dtype=int), values))
+
+	#------------------------------------------------------------------------------------
+	def __tsyslogMeans(self):
+		'''
+		Table of the Tsys printed inside the LOG file: one row for each time tag (sorted) and one column for
+		each DBBC channel (self.__tsyslogColumns), with the mean value of the channel at that time (NaN if none).
+		Return the time tags (seconds), the table and the number of values of each cell.
+		'''
+
+		self.__readTsysLog()
+		columns = len(self.__tsyslogColumns)
+		times = [np.zeros(0, dtype=np.int64)]
+		lines = [np.zeros(0, dtype=int)]
+		valueColumns = [np.zeros(0, dtype=int)]
+		values = [np.zeros(0)]
+		lineOffset = 0
+		for blockTimes, blockLines, blockColumns, blockValues in self.__tsyslogBlocks:
+			times.append(blockTimes)
+			lines.append(blockLines + lineOffset)
+			valueColumns.append(blockColumns)
+			values.append(blockValues)
+			lineOffset += len(blockTimes)
+		times, rows = np.unique(np.concatenate(times), return_inverse=True)
+		cells = rows[np.concatenate(lines)] * columns + np.concatenate(valueColumns)
+
+		size = len(times) * columns
+		counts = np.bincount(cells, minlength=size).reshape(len(times), columns)
+		sums = np.bincount(cells, np.concatenate(values), size).reshape(len(times), columns)	# The values are added in the order of the lines
+		means = np.empty(sums.shape)
+		means.fill(np.nan)
+		np.divide(sums, counts, out=means, where=counts > 0)
+		return times / 1e6, means, counts
+
+	#------------------------------------------------------------------------------------
+	def __getTsys(self, bbccodelist, lineTime):
 		'''
 		Calculate Tsys for each individual DBBC channel used in the LOG file.
+		All DBBC channels are calculated at once with NumPy. Channels whose Tsys cannot be calculated
+		(no Tcal, a temperature variable missing) are masked and returned as -1.
 
 		@param bbccodelist List that contains all individual DBBC channel used in the LOG file
-		@param dt Date when integration was completed.
+		@param lineTime Time tag (microseconds) when integration was completed.
 		'''
 
 		if not self.__headerComp and not (self.__currentSetup in self.calModeName):		# If header reading was not finished yet means that no tpicd line was found in the LOG file.
 			self.calModeName[self.__currentSetup] = "SINGLE"				# In that case, set SINGLE as the calibration mode used by the DBBC.
+			self.__resolveTpicd()
 			self.__setParams()
 			self.__headerComp = True
 
-                temp=[]
-                dt_newOrder = datetime.datetime(2015,9,17)
-                tpzero = 0
-                for i in bbccodelist:
-			if not i in self.__tempDict[-1]:
-				temp.append(-1)
-                                continue
+		tpzero = 0
+		tsys = np.empty(len(bbccodelist))
+		tsys.fill(-1)
 
-                	tcal = self.__tempDict[-1][i][0]			# Get Tcal from temperature dictionary. This dictionary was filled with Tcal from RXG files or LOG file.
-			if tcal == 0:
-				temp.append(-1)					# If Tcal is 0, Tsys cannot be calculated.
-                                continue
+		tcalDict = self.__tempDict[-1]						# Get Tcal from temperature dictionary. This dictionary was filled with Tcal from RXG files or LOG file.
+		tcal = np.array([tcalDict[i][0] if i in tcalDict else 0 for i in bbccodelist], dtype=float)
+		valid = tcal != 0							# If Tcal is 0 or missing, Tsys cannot be calculated.
 
-			if self.calModeName[self.__currentSetup] == "CONT":		# If the DBBC uses CONTINUOUS calibration mode, tpicd1 and tpicd2 will be used to calculate Tsys.
+		slots = self.__tsysSlots(bbccodelist)					# Mean values of tpicd (indexes 0 and 1 of self.__tempDict)
+		self.__sumTpicd()
+		read = self.__tpicdCount[slots]
+		means = self.__tpicdSum[slots] / np.maximum(read, 1)
+		read = read > 0
+		self.__tempValues(1, bbccodelist, means[:, 1], read[:, 1])		# tpiprime (SINGLE) is kept in its dictionary
 
-				try:
-	                                if dt < dt_newOrder:				# Until 17th september 2015, tpicd2 was Vsys ON and tpicd1 was Vsys OFF
-	                         	       vsysONlist = self.__tempDict[1][i]
-	                                       vsysOFFlist = self.__tempDict[0][i]
-	                                else:						# After 17th september 2015, tpicd1 is Vsys ON and tpicd2 is Vsys OFF
-	                                       vsysONlist = self.__tempDict[0][i]
-	                                       vsysOFFlist = self.__tempDict[1][i]
-				except:
-					temp.append(-1)					# Tsys cannot be calculated if there is any exception getting temperature variables
-					continue					# from temperature dictionaries for a certain DBBC channel.
+		if self.calModeName[self.__currentSetup] == "CONT":			# If the DBBC uses CONTINUOUS calibration mode, tpicd1 and tpicd2 will be used to calculate Tsys.
+
+			if lineTime < self.__newOrder:					# Until 17th september 2015, tpicd2 was Vsys ON and tpicd1 was Vsys OFF
+				means = means[:, ::-1]					# (after it, tpicd1 is Vsys ON and tpicd2 is Vsys OFF)
+			vsysON = means[:, 0]
+			vsysOFF = means[:, 1]
+			valid &= read.all(axis=1)
+			valid &= ~(vsysON <= vsysOFF)					# If Vsys OFF is greater than Vsys ON, Tsys cannot be calculated.
+			np.divide(0.5*tcal*(vsysON+vsysOFF), vsysON-vsysOFF, out=tsys, where=valid)
+
+		elif self.calModeName[self.__currentSetup] == "SINGLE":			# If the DBBC uses SINGLE calibration mode, tpicd, tpiprime and tpical (or tpdiff) will be used to calculate Tsys.
+
+			if len(self.__tempDict) < 4:					# No tpdiff dictionary (CONTINUOUS dictionaries): Tsys cannot be calculated.
+				valid[:] = False
+			else:
+				vsys = means[:, 0]
+				tpiprime = means[:, 1]
+				tpical = np.zeros(len(bbccodelist))
+				tpidiff = np.zeros(len(bbccodelist))
+				read = np.column_stack((read, np.zeros((len(bbccodelist), 2), dtype=bool)))
+				self.__tempValues(2, bbccodelist, tpical, read[:, 2])
+				self.__tempValues(3, bbccodelist, tpidiff, read[:, 3])
+
+				empty = [self.__tempEmpty(ind) for ind in range(4)]
+				for ind in range(4):
+					if not empty[ind]:					# A temperature variable read for other channels but not for this one
+						valid &= read[:, ind]
+
+				if not empty[3]:
+					if empty[0]:
+						valid[:] = False
+					valid &= ~(tpidiff <= 0)
+					np.divide(tcal*(vsys-tpzero), tpidiff, out=tsys, where=valid)
+				else:
+					if empty[1] or empty[2] or empty[0]:			# If any temperature variable is empty, Tsys cannot be calculated.
+						valid[:] = False
+					valid &= ~(tpical <= tpiprime)				# If tpiprime is greater than tpical, Tsys cannot be calculated.
+					np.divide(tcal*(vsys-tpzero), tpical-tpiprime, out=tsys, where=valid)
+
+		self.__tempDict[0] = dict()						# Clear temperature dictionaries:
+		if self.calModeName[self.__currentSetup] == "CONT":			#	CONTINUOUS calibration case: tpicd1 and tpicd2 (indexes 0 and 1)
+			self.__tempDict[1] = dict()					#	SINGLE calibration case: tpicd (index 0)
+			self.__resetTpicd([0, 1])
+		else:
+			self.__resetTpicd([0])
+
+		return tsys.tolist()
+
+	#------------------------------------------------------------------------------------
+	def __tsysSlots(self, bbccodelist):
+		'''
+		Rows of a list of DBBC channels in the tpicd running sums.
+
+		@param bbccodelist List of DBBC channels.
+		'''
+
+		key = tuple(bbccodelist)
+		if not key in self.__tsysSlotsDict:
+			self.__tsysSlotsDict[key] = np.array([self.__tpicdSlot(i) for i in bbccodelist], dtype=int)
+		return self.__tsysSlotsDict[key]
+
+	#------------------------------------------------------------------------------------
+	def __tempValues(self, ind, bbccodelist, values, read):
+		'''
+		Fill the mean values of a temperature variable kept in the lists of self.__tempDict.
+		The tpicd values (indexes 0 and 1) are in the running sums instead (see self.__addTpicd).
+
+		@param ind Index of the temperature variable in self.__tempDict.
+		@param bbccodelist List of DBBC channels.
+		@param values Array of the mean values of the DBBC channels (modified).
+		@param read Array, True for the DBBC channels that have any value (modified).
+		'''
+
+		tempDict = self.__tempDict[ind]
+		if tempDict:
+			for j in range(len(bbccodelist)):
+				if bbccodelist[j] in tempDict:
+					auxList = tempDict[bbccodelist[j]]
+					values[j] = sum(auxList)/len(auxList)
+					read[j] = True
+
+	#------------------------------------------------------------------------------------
+	def __tempEmpty(self, ind):
+		'''
+		Check if a temperature variable has no value for any DBBC channel in the integration.
+
+		@param ind Index of the temperature variable in self.__tempDict.
+		'''
+
+		if self.__tempDict[ind]:
+			return False
+		return ind >= 2 or not self.__tpicdCount[:, ind].any()
+
+	#------------------------------------------------------------------------------------
+	def __resetTpicd(self, rows):
+		'''
+		Clear the tpicd running sums, together with the temperature dictionaries they belong to.
 
+		@param rows Indexes in self.__tempDict (0 and/or 1).
+		'''
 
-                                if len(vsysONlist) == 0 or len(vsysOFFlist) == 0:	# If any Vsys list is empty, Tsys cannot be calculated.
-                                       continue
+		self.__sumTpicd()
+		if len(rows) == 2:
+			self.__tpicdSum.fill(0)
+			self.__tpicdCount.fill(0)
+		else:
+			self.__tpicdSum[:, rows[0]] = 0
+			self.__tpicdCount[:, rows[0]] = 0
 
-                                vsysON = sum(vsysONlist)/len(vsysONlist)		# Get the mean value of Vsys ON and Vsys OFF
-                                vsysOFF = sum(vsysOFFlist)/len(vsysOFFlist)
+	#------------------------------------------------------------------------------------
+	def __tpicdSlot(self, code):
+		'''
+		Row of a DBBC channel in the tpicd running sums. New channels get the next one.
 
-                                if vsysON <= vsysOFF:					# If Vsys OFF is greater than Vsys ON, Tsys cannot be calculated.
-                                	tsys=-1
-                                else:
-                                        tsys=0.5*tcal*(vsysON+vsysOFF)/(vsysON-vsysOFF)
+		@param code DBBC channel.
+		'''
 
-			elif self.calModeName[self.__currentSetup] == "SINGLE":		# If the DBBC uses CONTINUOUS calibration mode, tpicd, tpiprime and tpical will be used to calculate Tsys.
+		if not code in self.__chSlot:
+			slot = len(self.__chSlot)
+			if slot == len(self.__tpicdSum):
+				self.__tpicdSum = np.vstack((self.__tpicdSum, np.zeros_like(self.__tpicdSum)))
+				self.__tpicdCount = np.vstack((self.__tpicdCount, np.zeros_like(self.__tpicdCount)))
+			self.__chSlot[code] = slot
+		return self.__chSlot[code]
 
-				tpiprimeList = []
-				tpicalList = []
-				vsysList = []
-				tpidiffList = []
+	#------------------------------------------------------------------------------------
+	def __addTpicd(self, auxStr, tpcontDet):
+		'''
+		Add the values of a tpicd line to the running sums of the integration.
+		Index 0 has the first value of each DBBC channel and index 1 the second one (CONTINUOUS calibration).
+		A value that cannot be read counts as -1. With CONTINUOUS calibration, if the second value of a DBBC
+		channel cannot be read, the first one counts as -1 too, unless the channel is already in the integration:
+		then the first one is kept together with -1 for both.
+
+		The values are queued and added all together with NumPy when the sums are needed (self.__sumTpicd).
+		The list of DBBC channels repeats from line to line, so the positions of its values in the sums are
+		found only once (self.__tpicdLayouts).
+
+		@param auxStr Fields of the tpicd line after '/'.
+		@param tpcontDet True if CONTINUOUS calibration mode is used.
+		'''
 
+		step = 3 if tpcontDet else 2
+		key = (step, tuple(auxStr[0::step]))
+		if not key in self.__tpicdLayouts:
+			self.__tpicdLayouts[key] = self.__tpicdLayout(key[1], tpcontDet)
+		positions, fields, getter = self.__tpicdLayouts[key]
+
+		try:
+			values = map(float, getter(auxStr))
+		except (ValueError, IndexError):			# Some value cannot be read
+			values = []
+			for field in fields:
 				try:
-					if self.__tempDict[1]:
-						tpiprimeList = self.__tempDict[1][i]
-					if self.__tempDict[2]:
-		                                tpicalList = self.__tempDict[2][i]
-					if self.__tempDict[0]:
-						vsysList = self.__tempDict[0][i]
-					if self.__tempDict[3]:
-						tpidiffList = self.__tempDict[3][i]
-
-				except Exception, e:							# Tsys cannot be calculated if there is any exception getting temperature variables
-					temp.append(-1)					# from temperature dictionaries for a certain DBBC channel.
-					continue
-				if len(tpidiffList) != 0:
-					if len(vsysList) == 0:
-						temp.append(-1)
-						continue
-						#vsys = sum(tpiprimeList)/len(tpiprimeList)
+					values.append(float(auxStr[field]))
+				except (ValueError, IndexError):
+					values.append(None)
+
+			positions = list(positions)
+			for j in range(0, len(values), step - 1):
+				if not tpcontDet:
+					if values[j] is None:
+						values[j] = -1
+				elif values[j] is None or values[j+1] is None:
+					self.__sumTpicd()
+					if values[j] is not None and self.__tpicdCount.flat[positions[j]] > 0:
+						positions.append(positions[j])
+						values.append(-1)
 					else:
-						vsys = sum(vsysList)/len(vsysList)
-					tpidiff = sum(tpidiffList)/len(tpidiffList)
-					if tpidiff <= 0:
-						tsys=-1
-					else:
-						tsys=tcal*(vsys-tpzero)/tpidiff
+						values[j] = -1
+					values[j+1] = -1
 
-				else:
-	                                if len(tpiprimeList) == 0 or len(tpicalList) == 0:	# If any temperature list is empty, Tsys cannot be calculated.
-						temp.append(-1)
-	                                        continue
+		self.__tpicdPositions += positions
+		self.__tpicdValues += values
 
+	#------------------------------------------------------------------------------------
+	def __sumTpicd(self):
+		'''
+		Add the tpicd values queued by self.__addTpicd to the running sums.
+		np.bincount adds the values in the order given, as adding them one by one.
+		'''
+
+		if not self.__tpicdValues:
+			return
+
+		size = self.__tpicdSum.size
+		positions = np.array(self.__tpicdPositions, dtype=int)
+		self.__tpicdSum = np.bincount(np.concatenate((np.arange(size), positions)), np.concatenate((self.__tpicdSum.ravel(), self.__tpicdValues)), size).reshape(-1, 2)
+		self.__tpicdCount += np.bincount(positions, minlength=size).reshape(-1, 2)
+		self.__tpicdPositions = []
+		self.__tpicdValues = []
+
+	#------------------------------------------------------------------------------------
+	def __resolveTpicd(self):
+		'''
+		Move to the running sums the values stored in the tpicd dictionaries (index 0, and 1 with CONTINUOUS
+		calibration) while the calibration mode of the setup was not known. Once it is known, this is called and
+		they replace what the sums have for their DBBC channels. From then on, tpicd values only go to the sums.
+		'''
 
-		                        tpiprime = sum(tpiprimeList)/len(tpiprimeList)		# Get the mean value of each temperature variable.
-	                                tpical = sum(tpicalList)/len(tpicalList)
-					if len(vsysList) == 0:
-						temp.append(-1)
-						continue
-						#vsys = sum(tpiprimeList)/len(tpiprimeList)
-					else:
-						vsys = sum(vsysList)/len(vsysList)
-	                                if tpical<=tpiprime:					# If tpiprime is greater than tpical, Tsys cannot be calculated.
-	                                	tsys=-1
-						#print "tpiprime: %f; tpical: %f" % (tpiprime,tpical)
-	                                else:
-	                                	tsys=tcal*(vsys-tpzero)/(tpical-tpiprime)
+		self.__sumTpicd()
+		for ind in range(1 + (self.calModeName[self.__currentSetup] == "CONT")):
+			for code, values in self.__tempDict[ind].items():
+				slot = self.__tpicdSlot(code)
+				self.__tpicdSum[slot, ind] = 0
+				for value in values:
+					self.__tpicdSum[slot, ind] += value
+				self.__tpicdCount[slot, ind] = len(values)
+			self.__tempDict[ind] = dict()
 
-			temp.append(tsys)
+	#------------------------------------------------------------------------------------
+	def __tpicdLayout(self, names, tpcontDet):
+		'''
+		Positions in the running sums (flattened) of the values of a tpicd line, fields of the line with them and
+		getter of the fields.
 
-		self.__tempDict[0] = dict()						# Clear temperature dictionaries:
-		if self.calModeName[self.__currentSetup] == "CONT":			#	CONTINUOUS calibration case: tpicd1 and tpicd2 (indexes 0 and 1)
-			self.__tempDict[1] = dict()					#	SINGLE calibration case: tpicd (index 0)
+		@param names DBBC channels of the line, in order.
+		@param tpcontDet True if CONTINUOUS calibration mode is used.
+		'''
 
-		return temp
+		step = 3 if tpcontDet else 2
+		positions = []
+		fields = []
+		for j in range(len(names)):
+			if names[j][self.__chIdIndex] in self.__chId:
+				slot = self.__tpicdSlot(names[j])
+				for ind in range(step - 1):
+					positions.append(2 * slot + ind)
+					fields.append(j * step + 1 + ind)
+		if len(fields) == 0:
+			getter = lambda auxStr: ()
+		elif len(fields) == 1:
+			getter = lambda auxStr: (auxStr[fields[0]],)
+		else:
+			getter = operator.itemgetter(*fields)
+		return positions, fields, getter
 
 	#------------------------------------------------------------------------------------
 	def __getTempLine(self, line, tempInd):
@@ -1303,6 +2420,10 @@ class logFile:
 		else:												# tpcontDet variable will be set to True, otherwise will be set to False.
 			tpcontDet = False
 
+		if tempInd == 1 and self.__currentSetup in self.calModeName:				# tpicd values are added to running sums
+			self.__addTpicd(auxStr, tpcontDet)
+			return
+
 		if tpcontDet:										# tpicd line using CONTINUOUS calibration mode:
                 	auxRange = range(0,len(auxStr),3)						# 	'#tpicd#tpcont/9l,17453,16984,9u,17553,17100,ic,1464.25'
                 else:											#	- Each individual DBBC channel has two temperature values
@@ -1345,11 +2466,10 @@ class logFile:
 			self.__caltempRead[self.__currentSetup] = True
 
 	#------------------------------------------------------------------------------------
-	def __readHeader(self, line):
-		'''Reads one LOG file line to find header variables.
-		Header variables are those coming from the procedures the first time they are executed,
-		because later they no longer appear in the log. Usually associated to different modes
-		or settings of the individual DBBC channels
+	def __readRack(self, line):
+		'''Reads one LOG file line to find the DBBC configuration mode.
+		It is a header variable, coming from the LOG file header or from the procedures the first time
+		they are executed. These lines have no fixed record format, so every line is checked until it is found.
 
 		Results are in private variables of the class:
 		self.dbbcModeName Name of the mode being used: None, DDC or PFB
@@ -1390,6 +2510,19 @@ class logFile:
 
 				return True
 
+		return False
+
+	#------------------------------------------------------------------------------------
+	def __readForm(self, line):
+		'''Reads one LOG file line to find the format type. It is a header variable, so it is
+		only read until we have started reading data.
+			"&setup01/form=astro"
+
+		@param line LOG file line read.
+		'''
+
+		if self.__headerComp:
+			return False
 
 		#---------------Lower Sideband Identification-----------------
 		if self.__idLine(line,['/form=']):				  #Get format type
@@ -1397,7 +2530,6 @@ class logFile:
 			#self.__lower = False
 			return True
 
-
 		return False
 
 	#------------------------------------------------------------------------------------
@@ -1412,11 +2544,60 @@ class logFile:
 				return (i+1)
 		return 0
 
+	#------------------------------------------------------------------------------------
+	def __getTime(self, line):
+		"""
+		Return the time tag of the LOG file line as microseconds since 1970.01.01, or None if it cannot be decoded.
+		Every line is decoded once: the time tags of the last lines are kept, because the next line of a line is the
+		following line to be read.
+
+		Float epoch seconds (as stored in the time lists) are self.__getTime(line) / 1e6, which is exactly the same
+		value as (dt - self.__epoch).total_seconds().
+		"""
+
+		if line in self.__times:
+			return self.__times[line]
+		if len(self.__times) > 2:
+			self.__times.clear()
+
+		lineTime = None
+		found = self.__timeTagRe.match(line)
+		if found:								# "yyyy.ddd.hh:mm:ss.ss"
+			year, day, hour, minu, sec, csec = [int(i) for i in found.groups()]
+			if 1 < year < 9999 and 1 <= day <= 366 and hour < 24 and minu < 60 and sec < 60:
+				lineTime = ((((yearDays(year) + day - 1)*24 + hour)*60 + minu)*60 + sec)*1000000 + csec*10000
+		if lineTime is None:							# Any other format is decoded as before
+			dt = self.__decodeDatetime(line)
+			if dt:
+				lineTime = self.__microseconds(dt)
+
+		self.__times[line] = lineTime
+		return lineTime
+
+	#------------------------------------------------------------------------------------
+	def __microseconds(self, dt):
+		"""
+		Return a python datetime.datetime as microseconds since 1970.01.01
+		"""
+		delta = dt - self.__epoch
+		return (delta.days*86400 + delta.seconds)*1000000 + delta.microseconds
+
 	#------------------------------------------------------------------------------------
 	def __getDatetime(self, line):
 		"""
 		Return the date of the LOG file line as python datetime.datetime
 		"""
+		lineTime = self.__getTime(line)
+		if lineTime is None:
+			return False
+		return self.__epoch + datetime.timedelta(0,0,lineTime)
+
+	#------------------------------------------------------------------------------------
+	def __decodeDatetime(self, line):
+		"""
+		Decode the date of the LOG file line as python datetime.datetime. It accepts time tags
+		that do not follow the "yyyy.ddd.hh:mm:ss.ss" format exactly.
+		"""
 		try:
 			auxDate = line.split('.')
 			auxTime = auxDate[2].split(':')
@@ -1439,6 +2620,22 @@ class logFile:
 
 		return self.logData
 
+	#------------------------------------------------------------------------------------
+	def channelTables(self):
+		'''Returns the DBBC channels of each ANTAB header (same order as self.logData[0]) as NumPy structured arrays,
+		with a row for each column of the header. See self.__channelType for the fields.
+		'''
+
+		return self.channels
+
+	#------------------------------------------------------------------------------------
+	def scanTable(self):
+		'''Returns the scans (same order as the scan comments of self.logData[2]) as a NumPy structured array, with
+		a row for each source line of the LOG file. See self.__scanFields for the fields.
+		'''
+
+		return self.scans
+
 	#------------------------------------------------------------------------------------
         def loArray(self):
                 '''Creates a set from the array removing repeated elements. It is a Python builtin module.
@@ -1449,7 +2646,12 @@ class logFile:
                 #fLOArray = sorted(set(fLOArray_aux), key=lambda x: fLOArray_aux.index(x))
 		fLOArray = dict()
 		for setup in reversed(fLOArray_aux.keys()):
-			fLOArray[setup] = sorted(set(fLOArray_aux[setup]), key=lambda x: fLOArray_aux[setup].index(x))
+			fLOArray[setup] = []
+			fLOFound = set()
+			for fLO in fLOArray_aux[setup]:		# In order of appearance
+				if not fLO in fLOFound:
+					fLOFound.add(fLO)
+					fLOArray[setup].append(fLO)
 
                 return fLOArray
 
@@ -1465,17 +2667,13 @@ class logFile:
 			fLOArray[setup] = []
 			pArray[setup] = []
 			tup = []
+			tupFound = set()		# Pairs of LO and pol already in tup
 			for key in self.polArray[setup]:
 				for ind in range(len(self.polArray[setup][key])):
-					appendData = True
-					if len(tup) == 0:
-						pass
-					else:
-						for i in range(0, len(tup)):
-							if (tup[i][0] == self.freqLOMHzArray[setup][key][ind]) and (tup[i][1] == self.polArray[setup][key][ind]):
-		 						appendData = False
-					if appendData:
-						tup.append((self.freqLOMHzArray[setup][key][ind], self.polArray[setup][key][ind]))
+					pair = (self.freqLOMHzArray[setup][key][ind], self.polArray[setup][key][ind])
+					if not pair in tupFound:
+						tupFound.add(pair)
+						tup.append(pair)
 
 			for el in tup:
 				fLOArray[setup].append(el[0])
@@ -1536,54 +2734,12 @@ class logFile:
 	#------------------------------------------------------------------------------------
 	def getRXGFileName(self, freqLOMHz):
 		'''Gets the name of the RXG file which matches the LO frequency
-		The procedure looks in directory /usr2/control/rxg_files
+		The procedure looks in directory /usr2/control/rxg_files (see rxgCatalog)
 		@param LO freq in MHz
 		@return RXG file name
 		'''
 
-		global rxgfiles
-		foundFile = False
-		fileRXG = " "
-
-		if rxgfiles:
-			ficherosRXG = rxgfiles
-		else:
-			ficherosRXG = os.listdir(self.__rxgDirectory)
-
-		for fileN in ficherosRXG:
-			if fileN.endswith(".rxg") and not foundFile:
-				#stName = fileN[5:7].lower()
-				#if stName != self.stationName.lower():
-				#	continue
-
-				# If the rxgfile are provided no need to check the name
-				stcode = self.stationName[0].upper()+self.stationName[1].lower()
-				if stcode not in fileN and not rxgfiles:
-					continue
-				fileName = "%s/%s" % (self.__rxgDirectory, fileN)
-				rxgF = rxgFile(fileName)
-				try:
-					fLOList = rxgF.lo()
-					if len(fLOList) == 1:
-						freqLOf = float(fLOList[0])
-						if freqLOMHz == freqLOf:
-							fileRXG = fileName
-							foundFile = True
-							break
-					else:
-						freqStart = float(fLOList[0])
-						freqEnd = float(fLOList[1])
-						if freqLOMHz >= freqStart and freqLOMHz <= freqEnd:
-							fileRXG = fileName
-							foundFile = True
-							break
-						else:
-							pass
-				except Exception, ex:
-					print "Error getting LO freq"
-					raise ex
-				del rxgF
-		return fileRXG
+		return get_rxg_catalog(self.__rxgDirectory, self.stationName).fileName(freqLOMHz)
 ###______________________________________________________________###
 class antabHeader:
 
@@ -1612,20 +2768,79 @@ class antabHeader:
                 self.stationName = self.logF.station()
                 self.rxgDirectory = "/usr2/control/rxg_files"
 		#self.rxgDirectory = "/usr2/oper/antabfs_pruebas/rxg_files"
+		self.__model = None		# LOs and RXG files of the setups. See self.__setupModel
+
+	# --------------------------------------------------------------------------------------------
+	def __setupModel(self):
+		'''Returns what the header needs from the LOG file, got only the first time:
+		'lop': LOs and pols of each setup (logFile.loPArray), 'lo': different LOs of each setup (logFile.loArray),
+		'rxgName': RXG file name of each LO, 'rxgFile': rxgFile of each RXG file read (see self.__rxgFile)
+		and 'channels': frequency and bandwidth of the channels of each setup (see self.__setupChannels).
+		'''
+
+		if self.__model is None:
+			model = {'lop': self.logF.loPArray(), 'lo': self.logF.loArray(), 'rxgName': dict(), 'rxgFile': dict(), 'channels': dict()}
+			for setup in model['lop'][0].keys():
+				for fLO in model['lop'][0][setup]:
+					if not fLO in model['rxgName']:
+						model['rxgName'][fLO] = self.logF.getRXGFileName(fLO)
+			self.__model = model
+		return self.__model
+
+	# --------------------------------------------------------------------------------------------
+	def __rxgFiles(self):
+		'''Returns the names of the RXG files required by the LOs of each setup, as logFile.rxgFiles
+		'''
+
+		model = self.__setupModel()
+		rxgFileArray = dict()
+		for setup in reversed(model['lo'].keys()):
+			rxgFileArray[setup] = [model['rxgName'][fLO] for fLO in model['lo'][setup]]
+		return rxgFileArray
+
+	# --------------------------------------------------------------------------------------------
+	def __rxgFile(self, rxgFileName):
+		'''Returns the rxgFile of an RXG file, read only the first time
+		'''
+
+		model = self.__setupModel()
+		if not rxgFileName in model['rxgFile']:
+			model['rxgFile'][rxgFileName] = get_rxg_file(rxgFileName)
+		return model['rxgFile'][rxgFileName]
 
+	# --------------------------------------------------------------------------------------------
+	def __setupChannels(self, setup):
+		'''Returns the frequency and the bandwidth of the channels of a setup, taken from the table of channels
+		of its header (see logFile.channelTables) only the first time.
+		'''
+
+		model = self.__setupModel()
+		if not setup in model['channels']:
+			logData = self.logF.getLogData()
+			header = logData[0]
+			for index in range(len(header)):
+				if setup in header[index].split('\n')[1]:
+					break
+
+			table = self.logF.channelTables()[index]
+			model['channels'][setup] = zip(table['freq'].tolist(), table['bw'].tolist())
+		return model['channels'][setup]
+
+	# --------------------------------------------------------------------------------------------
 	def rxgLines(self):
 		'''Creates a line with information from the RXG file. This line will be included in the antab header
 		'''
 
 		linerxg = []
-		fLOArray, polArray = self.logF.loPArray()
+		model = self.__setupModel()
+		fLOArray, polArray = model['lop']
 
 		for setup in reversed(fLOArray.keys()):
 			i = 0
 			for fLO in fLOArray[setup]:
-				rxgFileName = self.logF.getRXGFileName(fLO)
+				rxgFileName = model['rxgName'][fLO]
 				print rxgFileName
-				rxgF = rxgFile(rxgFileName)
+				rxgF = self.__rxgFile(rxgFileName)
 
 				linerxg.append(	"%.2f MHz %s: %s %s" % (fLO, polArray[setup][i], rxgF.name(), rxgF.date()) )
 				i += 1
@@ -1642,9 +2857,7 @@ class antabHeader:
 		'''
 
 		dpfuLineArray = dict()
-		rxgFilesArray = self.logF.rxgFiles()
-		logData = self.logF.getLogData()
-		header = logData[0]
+		rxgFilesArray = self.__rxgFiles()
 		#index = 0
 
 		for setup in reversed(rxgFilesArray.keys()):
@@ -1653,8 +2866,8 @@ class antabHeader:
 				strLine = ""
 				if rxgFileName == " ":
 					continue
-				rFile = rxgFile(rxgFileName)
-				dpfuList = rFile.dpfu()
+				rFile = self.__rxgFile(rxgFileName)
+				dpfuList = rFile.dpfuValues()
 				freqMin, freqMax = rFile.freqMinMax()
 				#bw = self.logF.bandwidth()
 
@@ -1668,22 +2881,13 @@ class antabHeader:
 						strLine = "%s,%s" % (strLine,element)
 					i = i + 1
 
-				for line in header:
-					hLines_aux = line.split('\n')
-					if setup in hLines_aux[1]:
-						break
-
-				hLines = hLines_aux[4:]
-				#hLines = header[index].split('\n')[4:]
 				ifFreq = []
 				ifBw = []
-				for line in hLines:
-					auxStr = line.split()
-					freqAux = float(auxStr[6])
+				for freqAux, bwAux in self.__setupChannels(setup):
 					#if int(freqAux) >= freqMin and int(freqAux) <= freqMax:
-					if freqAux >= (freqMin-float(auxStr[11])) and freqAux <= (freqMax+float(auxStr[11])):
+					if freqAux >= (freqMin-bwAux) and freqAux <= (freqMax+bwAux):
 						ifFreq.append(freqAux)
-						ifBw.append(float(auxStr[11]))
+						ifBw.append(bwAux)
 
 				if len(ifFreq) == 0:
 					ifFreq = [freqMin,freqMax]
@@ -1707,7 +2911,7 @@ class antabHeader:
 		'''
 
 		polyLineArray = dict()
-		rxgFilesArray = self.logF.rxgFiles()
+		rxgFilesArray = self.__rxgFiles()
 
 		for setup in reversed(rxgFilesArray.keys()):
 			polyLineArray[setup] = []
@@ -1715,12 +2919,12 @@ class antabHeader:
 				strLine = ""
 				if rxgFileName == " ":
 					continue
-				rFile = rxgFile(rxgFileName)
-				gainList = rFile.gain()
+				rFile = self.__rxgFile(rxgFileName)
+				gainList = rFile.gainPoly()
 
 				strLine = 'POLY='
 				i = 0
-				for element in gainList[2:]:
+				for element in gainList:
 					if i == 0:
 						strLine = "%s%s" % (strLine,element)
 					else:
@@ -1742,7 +2946,8 @@ class antabHeader:
 		'''
 		loLines = []
 
-		fLOMHzArray, polArray = self.logF.loPArray()
+		model = self.__setupModel()
+		fLOMHzArray, polArray = model['lop']
 
 		setups = fLOMHzArray.keys()
 		setups.sort()
@@ -1754,13 +2959,13 @@ class antabHeader:
 			loLinesList = []
 			freqList = []
 			for lof in fLOMHzArray[setup]:
-				rxgFileName = self.logF.getRXGFileName(lof)
+				rxgFileName = model['rxgName'][lof]
 				if rxgFileName == " ":
 					lstr = '!     LO=%.2f MHz %s' % (lof, polArray[setup][i])
 	                        	loLinesList.append(lstr)
 					freqList.append(lof)
 				else:
-					rFile = rxgFile(rxgFileName)
+					rFile = self.__rxgFile(rxgFileName)
 					lstr = '!     LO=%.2f MHz %s %s %s' % (lof, polArray[setup][i], rFile.name(), rFile.date())
 					loLinesList.append(lstr)
 					freqList.append(lof)
@@ -1825,7 +3030,7 @@ class antabHeader:
 		'''Return an array with the name of the band using the LO values
 		'''
 
-		fLOMHzArray = self.logF.loArray()
+		fLOMHzArray = self.__setupModel()['lo']
 		wavebandArray = []
 
 		for setup in reversed(fLOMHzArray.keys()):
@@ -2006,43 +3211,229 @@ class Selection(object):	#clase para la selección manual de los datos
 			plt.show()
 			self.press=False
 #-----------------------------------------------------------------------------------------------------
+class AutoSelection(object):	#selection of the data without windows (--auto)
+	'''Does the work of Selection without asking the user: the outliers of the fit of each scan (the red points of
+	Selection) are replaced as modifydata does with the points inside a rectangle, and the fit is done again until
+	there are no outliers or after maxRounds. A warning is printed if outliers are left.
+	'''
+
+	def __init__(self,x,y,block,title,tolerance=0.1,maxRounds=10):
+
+		self.title=title
+		self.tolerance=tolerance
+		self.flagged=0
+
+		x=np.array(x)
+		minutes=(x-x[0])*(24.*60.)
+		keep=minutes>=0
+		self.delIndX=np.nonzero(~keep)[0].tolist()
+		self.x=minutes[keep]
+		self.y=np.array(y,dtype=float)[keep]
+		self.block=np.array(block)[keep]
+
+		left=0
+		for i in range(maxRounds+1):
+			if not len(self.y):
+				break
+			fit,low,up,inx,iny,outx,outy=outliers(self.block,self.x,self.y,self.tolerance)
+			cond=~((self.y<np.array(low))+(self.y>np.array(up)))
+			left=len(cond)-np.count_nonzero(cond)
+			if not left or not cond.any() or i==maxRounds:	#no outliers, nothing to take the geometric mean from or last round
+				break
+			ind,temp=replace_bad(self.y,self.block,cond)
+			self.y[ind]=temp
+			self.flagged+=len(ind)
+		print 'Tsys %s: %d points replaced' % (self.title,self.flagged)
+		if left:
+			if left==len(cond):
+				print 'Warning: %d outliers left in Tsys %s: no point is inside the tolerance of the fit' % (left,self.title)
+			else:
+				print 'Warning: %d outliers left in Tsys %s after %d rounds' % (left,self.title,maxRounds)
+
+	def getDeletedX(self):
+		return self.delIndX
+#-----------------------------------------------------------------------------------------------------
+rxgCache = None
+def rxg_cache():
+	'''Returns the RXG files saved by the previous runs in rxgCacheFile, loading it the first time:
+	{'dirs': {directory: (modification time, file names)}, 'files': {file name: ((size, modification time), rxgFile)},
+	'catalogs': {(directory, RXG files given, station): rxgCatalog}}. The RXG files are saved already parsed.
+	'''
+
+	global rxgCache
+	if rxgCache is None:
+		rxgCache = {'dirs': dict(), 'files': dict(), 'catalogs': dict()}
+		if rxgCacheFile:
+			try:
+				cacheIn = open(rxgCacheFile, 'rb')
+			except IOError:
+				return rxgCache
+			try:
+				try:
+					if cPickle.load(cacheIn) == (version, rxgCacheFormat):
+						rxgCache = cPickle.load(cacheIn)
+				except Exception, ex:
+					print 'Cache file %s could not be read: %s' % (rxgCacheFile, ex)
+			finally:
+				cacheIn.close()
+		rxgCache['changed'] = False
+	return rxgCache
+#-----------------------------------------------------------------------------------------------------
+def save_rxg_cache():
+	'''Saves the RXG files read in rxgCacheFile, if there is anything new. If it cannot be written, nothing else happens.
+	It is called at the end of main, so the RXG files read by any part of the program are saved.
+	'''
+
+	if not rxgCacheFile or rxgCache is None or not rxgCache['changed']:
+		return
+	saved = {'dirs': rxgCache['dirs'], 'files': rxgCache['files'], 'catalogs': rxgCache['catalogs']}
+	tmpName = rxgCacheFile + '.tmp'
+	try:
+		if not os.path.isdir(os.path.dirname(rxgCacheFile)):
+			os.makedirs(os.path.dirname(rxgCacheFile))
+		cacheOut = open(tmpName, 'wb')
+		try:
+			cPickle.dump((version, rxgCacheFormat), cacheOut, cPickle.HIGHEST_PROTOCOL)
+			cPickle.dump(saved, cacheOut, cPickle.HIGHEST_PROTOCOL)
+		finally:
+			cacheOut.close()
+		os.rename(tmpName, rxgCacheFile)
+		rxgCache['changed'] = False
+	except (IOError, OSError), ex:
+		print 'Cache file %s could not be written: %s' % (rxgCacheFile, ex)
+#-----------------------------------------------------------------------------------------------------
+def rxg_file_stamp(fileName):
+	'''Returns the (size, modification time) of a file or directory, or None if it does not exist.
+	'''
+
+	try:
+		fileStat = os.stat(fileName)
+	except OSError:
+		return None
+	return (fileStat.st_size, fileStat.st_mtime)
+#-----------------------------------------------------------------------------------------------------
+def list_rxg_directory(directory):
+	'''Returns the names of the files in the RXG directory, as os.listdir. The directory is listed again
+	only if it was modified since the names were saved (see rxg_cache).
+	@param directory Directory of the RXG files
+	'''
+
+	cache = rxg_cache()
+	key = os.path.abspath(directory)
+	stamp = rxg_file_stamp(directory)
+	if stamp is None or not key in cache['dirs'] or cache['dirs'][key][0] != stamp[1]:
+		names = os.listdir(directory)
+		cache['dirs'][key] = (stamp[1], names)
+		cache['changed'] = True
+	return list(cache['dirs'][key][1])
+#-----------------------------------------------------------------------------------------------------
+def get_rxg_file(fileName):
+	'''Returns the rxgFile of an RXG file. It is read and parsed again only if its size or modification time
+	changed since it was saved (see rxg_cache).
+	@param fileName Name of the RXG file
+	'''
+
+	cache = rxg_cache()
+	key = os.path.abspath(fileName)
+	stamp = rxg_file_stamp(fileName)
+	if stamp is None:
+		return rxgFile(fileName)
+	if not key in cache['files'] or cache['files'][key][0] != stamp:
+		cache['files'][key] = (stamp, rxgFile(fileName))
+		cache['changed'] = True
+	return cache['files'][key][1]
+#-----------------------------------------------------------------------------------------------------
+def get_rxg_catalog(directory, stationName):
+	'''Returns the rxgCatalog of the RXG files of a station. It is made again only if the RXG directory
+	or the RXG files changed since it was saved (see rxg_cache). The RXG files given by the user (global rxgfiles) are used if any.
+	@param directory Directory of the RXG files
+	@param stationName Station code
+	'''
+
+	global rxgfiles
+	cache = rxg_cache()
+	key = (directory, tuple(rxgfiles) if rxgfiles else None, stationName[:2].lower())
+	if not key in cache['catalogs'] or not cache['catalogs'][key].isValid():
+		cache['catalogs'][key] = rxgCatalog(directory, rxgfiles, stationName)
+		cache['changed'] = True
+	return cache['catalogs'][key]
+#-----------------------------------------------------------------------------------------------------
+yearDaysDict = dict()
+def yearDays(year):
+	'''
+	Days from 1970.01.01 to the 1st of January of the given year.
+	'''
+	if not year in yearDaysDict:
+		yearDaysDict[year] = (datetime.date(year,1,1) - datetime.date(1970,1,1)).days
+	return yearDaysDict[year]
+
+#--------------------------------------------------------------------------------------------------
+def group_geomeans(values,groups,ngroups):	#geometric mean of the values of each group
+	'''Geometric mean of the values of every group at once. It is calculated as it always was, multiplying
+	value**(1/n) in the order of the values, so the result is the same to the last bit. Groups without values get 1.
+	@param values Values (NumPy array)
+	@param groups Group of each value (integers from 0 to ngroups-1)
+	@param ngroups Number of groups
+	'''
+
+	count=np.bincount(groups,minlength=ngroups)
+	order=np.argsort(groups,kind='mergesort')		#the values of each group together, in their order
+	terms=values[order]**(1/count[groups[order]].astype(float))
+	gm=np.ones(ngroups)
+	present=np.nonzero(count)[0]
+	if len(present):
+		starts=np.concatenate(([0],np.cumsum(count[present])[:-1]))
+		gm[present]=np.multiply.reduceat(terms,starts)
+	return gm
+#-----------------------------------------------------------------------------------------------------
+def next_good(hasgood):		#index of the next sample with good data
+	'''For every sample, the index of the first sample from it on (along the last axis) that has good data,
+	or the number of samples if there is none.
+	@param hasgood Boolean array
+	'''
+
+	n=hasgood.shape[-1]
+	ind=np.where(hasgood,np.arange(n),n)
+	return np.minimum.accumulate(ind[...,::-1],axis=-1)[...,::-1]
+#-----------------------------------------------------------------------------------------------------
+def replace_bad(y,block,cond):
+	'''Geometric mean of the good points of their scan for each bad point. If their scan has no good points, the next
+	scan with good points (up to 19 points ahead) is used, and if there is none, all the good points.
+
+	@param y Tsys
+	@param block Scan of each point
+	@param cond True for the good points
+	@return Indexes of the bad points and their new values
+	'''
+
+	block=np.asarray(block)
+	scans,group=np.unique(block,return_inverse=True)
+	gm=group_geomeans(y[cond],group[cond],len(scans))		#geometric mean of each scan
+	hasgood=np.bincount(group[cond],minlength=len(scans))[group]>0
+	nextgood=np.append(next_good(hasgood)[1:],len(y))		#next point after each one whose scan has good points
+
+	ind=np.nonzero(~cond)[0]
+	temp=np.empty(len(ind))
+	same=hasgood[ind]
+	temp[same]=gm[group[ind[same]]]
+	ahead=~same&(nextgood[ind]<len(y))&(nextgood[ind]-ind<=19)
+	temp[ahead]=gm[group[nextgood[ind[ahead]]]]
+	rest=~same&~ahead						#if nothing good, compute mean of all data, another alternative is delete the whole line but is more difficult to implement and you lose data in all bbc
+	if rest.any():
+		temp[rest]=group_geomeans(y[cond],np.zeros(cond.sum(),dtype=int),1)[0]
+	return ind,temp
+#-----------------------------------------------------------------------------------------------------
 def modifydata(x,y,block,xmax,xmin,ymax,ymin):
+	'''Replaces the points inside the rectangle by the geometric mean of the good points (the rest) of their scan.
+	If their scan has no good points, the next scan with good points (up to 19 points ahead) is used, and if there
+	is none, all the good points. All the points are replaced at once.
+	'''
+
 	cond=(x<xmin)+(x>xmax)+(y<ymin)+(y>ymax)+(y<0)
-	for i in range(0,len(cond)):
-		if cond[i]==False:
-			bcond=(np.array(block)==block[i])*cond
-			templist=np.extract(bcond,y)
-			icount=i
-			while len(templist)==0:
-				bcond=(np.array(block)==block[icount])*cond
-				templist=np.extract(bcond,y)
-				icount=icount+1
-				if (icount-i)>20:
-					#templist=[50]
-					templist=np.extract(cond,y)	#if nothing good, compute mean of all data, another alternative is delete the whole line but is more difficult to implement and you lose data in all bbc
-					break
-			temp=1
-			for j in templist:
-				temp=temp*j**(1/float(len(templist)))
-			y[i]=temp
+	ind,temp=replace_bad(y,block,cond)
+	y[ind]=temp
 	return y
 #-----------------------------------------------------------------------------------------------------
-def smfit(x,y):		#fit data, lower and upper limits
-	if len(x)>1:						#it would be convenient to rewrite this without statsmodels, using pyplot and a exp func
-		x=np.array(x)
-		y=np.array(y)
-		X=np.column_stack((x,np.ones(len(x))))
-		res = smapi.OLS(y,X).fit()
-		prstd, low, up = wls_prediction_std(res)
-		fit=res.fittedvalues
-		return  res.fittedvalues,low,up
-	elif len(x)==1:
-		nodata=np.array([y,y-0.1*y,y+0.1*y])
-		return nodata
-	else:
-		nodata=np.array([[],[],[]])
-		return nodata
-#-----------------------------------------------------------------------------------------------------
 def finalplot(x,y,bbclist,partNum):	#plot all procesed data
 	style=['bo','go','ro','co','mo','yo','ko','wo','b*','g*','r*','c*','m*','y*','k*','w*','b^','g^','r^','c^','m^','y^','k^','w^','bs','gs','rs','cs','ms','ys','ks','ws']
 	fig = plt.figure(figsize=(16,11))
@@ -2074,18 +3465,40 @@ def finalplot(x,y,bbclist,partNum):	#plot all procesed data
 	ax.set_xticklabels(labels)
 	plt.show()
 #-----------------------------------------------------------------------------------------------------
+def groupfit(block,x,y):	#fit a line to the data of every scan at once
+	'''Least squares straight line of each scan, for all the scans at once with closed-form
+	sums. A scan with only one point is fitted by the point and a scan with all its points at the same time by their mean.
+	@param block Scan number of each point
+	@param x Time of each point
+	@param y Value of each point. It can be a matrix with a row for each channel, so all the channels are fitted at once.
+	@return Fitted value of each point, in the same order (and shape) as y
+	'''
+
+	x=np.asarray(x,dtype=float)
+	y=np.asarray(y,dtype=float)
+	scans,group=np.unique(np.asarray(block),return_inverse=True)
+	rows=y.reshape(-1,len(x))
+	group=(np.arange(len(rows))[:,None]*len(scans)+group).ravel()	#a group for each scan of each channel
+	xrows=np.tile(x,len(rows))
+	n=np.bincount(group,minlength=len(rows)*len(scans))
+	n=np.maximum(n,1)
+	mx=np.bincount(group,xrows,minlength=len(n))/n
+	my=np.bincount(group,rows.ravel(),minlength=len(n))/n
+	dx=xrows-mx[group]							#centered, so large times lose no precision
+	sxx=np.bincount(group,dx*dx,minlength=len(n))
+	sxy=np.bincount(group,dx*(rows.ravel()-my[group]),minlength=len(n))
+	slope=np.zeros(len(n))
+	np.divide(sxy,sxx,out=slope,where=sxx>0)
+	return (my[group]+slope[group]*dx).reshape(y.shape)
+#-----------------------------------------------------------------------------------------------------
 def outliers(block,x,y,tolerance):
-	fit=[];low=[];up=[]
-	for j in range(min(block),max(block)+1):				#fit data in diferent parts
+	if len(block)==0:
+		fit=[]
+	else:
 		#no hay que quitar los outliers sino darles el valor del fit o de la moda
-		cond=np.array(block)==j
-		xblock=np.extract(cond,x)
-		yblock=np.extract(cond,y)
-		fitblock,lowblock,upblock=smfit(xblock,yblock)	#statsmodels to compute the fit and limits
-		fit=fit+fitblock.tolist()
-		low=low+lowblock.tolist()
-		up=up+upblock.tolist()
-	low=np.array(fit)-np.array(fit)*tolerance		#sometimes statsmodels doesn't return the correct lower and upper limits
+		order=np.argsort(block,kind='mergesort')			#the fit is made in diferent parts, sorted by scan number
+		fit=groupfit(block,x,y)[order].tolist()
+	low=np.array(fit)-np.array(fit)*tolerance
 	up=np.array(fit)+np.array(fit)*tolerance
 	incond=(np.array(y)<=np.array(up))*(np.array(y)>=np.array(low))
 	inx=np.extract(incond,x)
@@ -2095,20 +3508,28 @@ def outliers(block,x,y,tolerance):
 	outy=np.extract(outcond,y)
 	return fit,low,up,inx,iny,outx,outy
 #-----------------------------------------------------------------------------------------------------
-def get_tcal(lofq,pol,freq,station):
+def tcal_rxg_files():
+	'''Returns the names of the RXG files that get_tcal checks, in order. If rxgfiles are provided check them,
+	otherwise look into cal dir.
+	'''
+
 	caldir='/usr2/control/rxg_files/'
 	#caldir='/usr2/oper/antabfs_pruebas/rxg_files/'
-	# If rxgfiles are provided check them, otherwhise look into cal dir
 	global rxgfiles
 
 	if rxgfiles:
 		rxglist = [caldir+i for i in rxgfiles]
 	else:
 		rxglist=[]
-		lall=os.listdir(caldir)
+		lall=list_rxg_directory(caldir)
 		for i in lall:
 			if i[-4:]=='.rxg':
 				rxglist.append(caldir+i)									#obtain .rxg format files
+	return rxglist
+#-----------------------------------------------------------------------------------------------------
+def get_tcal(lofq,pol,freq,station):
+	global rxgfiles
+	rxglist = tcal_rxg_files()
 
 	fileok=False
 	tcal=0
@@ -2119,7 +3540,7 @@ def get_tcal(lofq,pol,freq,station):
 		stcode = station[0].upper()+station[1]
 		if stcode in filename or rxgfiles:
 		#if station == stationfilename or forzado:
-			f=open(filename).read().splitlines()
+			f=''.join(get_rxg_file(filename).fileContent).splitlines()
 			for i in range(0,len(f)):
 				if f[i][0:5]=='range':
 					rmin=float(f[i].split()[1]);rmax=float(f[i].split()[2])
@@ -2152,11 +3573,357 @@ def get_tcal(lofq,pol,freq,station):
 		print 'A suitable rxg_file was not found. Maybe tcal is inside LOG file ("caltemp" tag)'
 	return tcal
 #-----------------------------------------------------------------------------------------------------
-def write_antab(fileOut,header,indexline,scanline,tsysline,block,time, tsyslog, setupTime, dpfuLines, polyelevLine, stationName):
-	'''Write the content of the antab file except the header
+def get_tcals(lofqs, pols, freqs, station):
+	'''Returns the Tcal of all the channels of a setup, as get_tcal does for each channel, but reading the
+	TCAL tables of the RXG files (see rxgFile.tcalLines) and interpolating all the channels of a LO and polarization
+	at once. get_tcal takes any two consecutive lines of a polarization, which are the same lines in the RXG files
+	that the FS reads. A channel out of the range of all TCAL tables gets 0. If some value of the RXG files could
+	not be converted, get_tcal is used for each channel so the same error is raised.
+	@param lofqs LO frequency of each channel
+	@param pols Polarization of each channel
+	@param freqs Frequency of each channel
+	@param station Station code
+	@return List with the Tcal of each channel
+	'''
+
+	global rxgfiles
+	if debug:
+		return [get_tcal(lofqs[i], pols[i], freqs[i], station) for i in range(len(freqs))]
+
+	tcals = np.zeros(len(freqs))
+	found = np.zeros(len(freqs), dtype=bool)
+	computed = np.zeros(len(freqs), dtype=bool)	# Tcal interpolated, maybe 0
+	fileok = dict()
+	try:
+		rxglist = tcal_rxg_files()
+		lofqArray = np.array(lofqs, dtype=float)
+		polArray = np.array(pols, dtype=object)
+		freqArray = np.array(freqs, dtype=float)
+		for lofq in set(lofqs):
+			fileok[lofq] = False
+			for filename in rxglist:
+				# Station code checkout is not necessary if user provides RXG files
+				stcode = station[0].upper()+station[1]
+				if not (stcode in filename or rxgfiles):
+					continue
+				limits, pairs = get_rxg_file(filename).tcalLines()
+
+				# Lines of the file checked: from the first LO line which matches (or the beginning if an
+				# RXG file already matched) until the first LO line which does not match
+				start = 0 if fileok[lofq] else None
+				stop = np.inf
+				for line, rmin, rmax in limits:
+					if rmin<=lofq<=rmax:
+						fileok[lofq] = True
+						if start is None:
+							start = line
+					else:
+						stop = line
+						break
+				if start is None:
+					continue
+
+				for pol in set(pols):
+					channels = np.nonzero((lofqArray == lofq) & (polArray == pol) & ~found)[0]
+					if len(channels) == 0 or not pol in pairs:
+						continue
+					lines, f1, f2, t1, t2 = pairs[pol]
+					checked = (start <= lines) & (lines < stop)
+					f1, f2, t1, t2 = f1[checked], f2[checked], t1[checked], t2[checked]
+					freq = freqArray[channels][:, None]
+					inRange = (f1 <= freq) & (freq <= f2)
+					inside = inRange.any(1)
+					first = inRange.argmax(1)[inside]		# The first pair of the file which contains the frequency
+					channels = channels[inside]
+					if (f2[first] == f1[first]).any():
+						raise ZeroDivisionError(filename)
+					freq = freqArray[channels]
+					tcal = t1[first]+(freq-f1[first])*(t2[first]-t1[first])/(f2[first]-f1[first])
+					tcals[channels] = tcal
+					computed[channels] = True
+					found[channels] = tcal != 0			# Otherwise the next RXG file is checked
+	except (ValueError, IndexError, ZeroDivisionError):		# Values of the RXG files that could not be converted
+		return [get_tcal(lofqs[i], pols[i], freqs[i], station) for i in range(len(freqs))]
+
+	result = []
+	for i in range(len(freqs)):
+		if computed[i]:
+			result.append(float(tcals[i]))
+		else:
+			result.append(0)
+		if fileok[lofqs[i]]==False:
+			print "tcal = %g" % result[i]
+			#sys.exit('A suitable rxg_file was not found')
+			print 'A suitable rxg_file was not found. Maybe tcal is inside LOG file ("caltemp" tag)'
+	return result
+#-----------------------------------------------------------------------------------------------------
+def time_fields(times):
+	'''Day of the year, hour, minute, second and microsecond of the time tags, the same as datetime.utcfromtimestamp
+	gives them, all at once.
+
+	@param times Time tags (seconds since 1970)
+	@return Arrays of days, hours, minutes, seconds and microseconds
+	'''
+
+	times=np.asarray(times,dtype=float)
+	seconds=np.floor(times)
+	us=np.floor((times-seconds)*1e6+0.5)			#rounded to microseconds as utcfromtimestamp does
+	seconds+=us==1e6
+	us[us==1e6]=0
+	seconds=seconds.astype(np.int64)
+	days=(seconds//86400).astype('datetime64[D]')
+	seconds%=86400
+	return (days-days.astype('datetime64[Y]')).astype(int)+1,seconds//3600,(seconds%3600)//60,seconds%60,us.astype(np.int64)
+#-----------------------------------------------------------------------------------------------------
+def antab_times(times):
+	'''Day of the year, hour and minutes (with their decimals) of the time tags, as they are written in the ANTAB file.
+
+	@param times Time tags (seconds since 1970)
+	@return Arrays of days, hours and minutes
+	'''
+
+	d,h,mi,s,us=time_fields(times)
+	return d,h,mi+(s/60.0)+us/(1e6*60.0)
+#-----------------------------------------------------------------------------------------------------
+def day_fractions(times):
+	'''Time tags as days of the year with their fraction, the time axis of the plots, all at once.
+
+	@param times Time tags (seconds since 1970)
+	'''
+
+	d,h,mi,s,us=time_fields(times)
+	return d+(h/24.)+(mi/(60.*24.))+(s/(3600.*24.))+(us/(3600.*24.*1e6))
+#-----------------------------------------------------------------------------------------------------
+def setup_bounds(times,setupTime):
+	'''First Tsys line of each setup and the end of the last one: a setup ends in the first Tsys line at or after the
+	start of the next one.
+
+	@param times Time tag of each Tsys line (seconds since 1970)
+	@param setupTime Start and name of each setup, as in logFile.getLogData
+	@return Array with an index more than setups
+	'''
+
+	times=np.asarray(times,dtype=float)
+	starts=np.array([setup[0] for setup in setupTime[1:]],dtype=float)
+	if (np.diff(times)>=0).all():
+		ends=np.searchsorted(times,starts,side='left')
+	else:
+		ends=np.array([np.argmax(times>=start) if (times>=start).any() else len(times) for start in starts],dtype=int)
+	return np.concatenate(([0],ends,[len(times)]))[:len(setupTime)+1]
+#-----------------------------------------------------------------------------------------------------
+def antab_lines(prefix,times,values,valid):
+	'''Text of Tsys lines of the ANTAB file, '\\n' + prefix + '%03d %02d:%05.2f' % (day, hour, minutes) and ' %.1f' of
+	each valid value, in one string.
+
+	@param prefix '' for the Tsys, '! ' for the Tsys of the LOG file
+	@param times Time tag of each line (seconds since 1970)
+	@param values Tsys of each line (2D array)
+	@param valid Values to write (2D array)
+	@return Text and the offset of each line in it (with the end as the last one)
+	'''
+
+	n=len(times)
+	if n==0:
+		return '',np.zeros(1,dtype=int)
+	values=np.asarray(values,dtype=float).reshape(n,-1)
+	valid=np.asarray(valid,dtype=bool).reshape(n,-1)
+
+	d,h,m=antab_times(times)
+	lines=[]
+	for day,hour,minutes,row,rowValid in zip(d.tolist(),h.tolist(),m.tolist(),values.tolist(),valid.tolist()):
+		cells=''.join([' %.1f'%v for v,ok in zip(row,rowValid) if ok])
+		lines.append('\n%s%03d %02d:%05.2f%s'%(prefix,day,hour,minutes,cells))
+	starts=np.zeros(n+1,dtype=int)
+	starts[1:]=np.cumsum([len(line) for line in lines])
+	return ''.join(lines),starts
+#-----------------------------------------------------------------------------------------------------
+def scan_comments(scans):
+	'''Scan comments of the ANTAB file ("! ddd hh:mm.mm: scanNum=nnnn scanName=name source=name") and their time tags
+	as days of the year, with the minutes rounded as they are written.
+
+	@param scans Table of scans (see logFile.scanTable)
+	@return List of comments and list of days
+	'''
+
+	d,h,m=antab_times(scans['time'])
+	comments=[]
+	days=[]
+	for i in range(len(scans)):
+		minutes='%05.2f'%m[i]
+		comments.append('\n! %03d %02d:%s: scanNum=%04d scanName=%s source=%s'%(d[i],h[i],minutes,scans['num'][i],scans['name'][i],scans['source'][i]))
+		days.append(int(d[i])+(int(h[i])/24.)+(float(minutes)/(24.*60.)))
+	return comments,days
+#-----------------------------------------------------------------------------------------------------
+def merge_positions(keys,kinds,thresholds,start=0):
+	'''Sorted merge of a stream of items with a sequence of events: each event takes the items, from the first one not
+	taken yet, while their key is not over the threshold of the event. It is done at once if the keys are sorted.
+
+	@param keys Key of each item, an array for each kind of event
+	@param kinds Kind of each event (index in keys)
+	@param thresholds Threshold of each event
+	@param start Number of items taken before the first event
+	@return Number of items taken after each event
+	'''
+
+	kinds=np.asarray(kinds,dtype=int)
+	thresholds=np.asarray(thresholds,dtype=float)
+	taken=np.zeros(len(kinds),dtype=int)
+	if all((np.diff(k)>=0).all() for k in keys):
+		for kind in range(len(keys)):
+			sel=kinds==kind
+			taken[sel]=np.searchsorted(keys[kind],thresholds[sel],side='right')
+		return np.maximum.accumulate(np.append(start,taken))[1:]
+	p=start
+	for e in range(len(kinds)):
+		key=keys[kinds[e]]
+		while p<len(key) and key[p]<=thresholds[e]:
+			p+=1
+		taken[e]=p
+	return taken
+#-----------------------------------------------------------------------------------------------------
+class antabWriter(object):
+	'''
+	Writes the Tsys of the ANTAB file (all but its preamble) setup by setup, as soon as the Tsys of each one are final.
+	The Tsys of the LOG file are merged into them and the header of each setup is written before its first Tsys line.
+	Only the Tsys given to self.write are kept in memory.
+	'''
+
+	#-----------------------------------------------------------------------------------------------------
+	def __init__(self, fileOut, header, indexline, scans, tsyslog, setupTime, dpfuLines, polyelevLine, stationName):
+		'''Constructor. The Tsys are appended to fileOut.
+
+		@param header, indexline, tsyslog, setupTime As in logFile.getLogData
+		@param scans Table of scans (see logFile.scanTable)
+		@param dpfuLines, polyelevLine GAIN lines of each setup, as returned by antabHeader.writeAntabPreamble
+		@param stationName Station code
+		'''
+
+		self.__f = open(fileOut, 'a')
+		self.__header = header
+		self.__indexline = indexline
+		self.__setupTime = setupTime
+		self.__dpfuLines = dpfuLines
+		self.__polyelevLine = polyelevLine
+		self.__stationName = stationName
+
+		# Tsys of the LOG file
+		self.__logTimes = np.array([line[0] for line in tsyslog], dtype=float)
+		if tsyslog:
+			self.__logValues = np.array([line[1:] for line in tsyslog], dtype=float).reshape(len(tsyslog), -1)
+		else:
+			self.__logValues = np.zeros((0,0))
+		d,h,m = antab_times(self.__logTimes)
+		self.__logDays = d+h/24.+m/(24.*60.)
+		self.__lastLog = max(len(tsyslog) - 1, 0)	# The last one is never written
+
+		# Scan comments, by scan number (the first one if there are more)
+		self.__comments, self.__scanDays = scan_comments(scans)
+		self.__scanIndex = dict()
+		for k in range(len(scans)-1, -1, -1):
+			self.__scanIndex[scans['num'][k]] = k
+
+		self.__setupInd = 0		# Next setup header to write
+		self.__taken = 0		# Tsys of the LOG file merged so far
+		self.__lastBlock = None		# Scan of the last Tsys line written
+
+	#-----------------------------------------------------------------------------------------------------
+	def write(self, tsysline, block, time):
+		'''Write Tsys lines after the ones already written.
+
+		@param tsysline Tsys matrix, a row for each Tsys line. The values that are not numbers are not written
+		@param block Scan of each Tsys line
+		@param time Time tag of each Tsys line (seconds since 1970)
+		'''
+
+		n = len(block)
+		tsys = np.asarray(tsysline,dtype=float)[:n]
+		tsys = tsys.reshape(n, tsys.size // n if n else 0)
+		valid = np.isfinite(tsys)
+		tsysText, tsysStarts = antab_lines('', time[:n], tsys, valid)
+		times = np.asarray(time[:n],dtype=float)
+
+		#header of each setup: in the first Tsys line after its time tag, and after the line of the previous one
+		setupRows = dict()
+		row = 0
+		while self.__setupInd < len(self.__setupTime):
+			later = np.nonzero(times[row:] >= self.__setupTime[self.__setupInd][0])[0]
+			if not len(later):
+				break
+			setupRows[row + later[0]] = self.__setupInd
+			row += later[0] + 1
+			self.__setupInd += 1
+
+		#events of the merge: the scan comment before the first Tsys line of each scan, and each Tsys line
+		blocks = np.asarray(block[:n])
+		hasScan = np.ones(n, dtype=bool)
+		hasScan[1:] = blocks[1:] != blocks[:-1]
+		if n and self.__lastBlock is not None:
+			hasScan[0] = block[0] != self.__lastBlock
+		for i in np.nonzero(hasScan)[0]:
+			hasScan[i] = block[i] in self.__scanIndex
+		if n:
+			self.__lastBlock = block[n-1]
+		eventRows = np.repeat(np.arange(n), 1 + hasScan)
+		kinds = np.ones(len(eventRows), dtype=int)
+		thresholds = times[eventRows]
+		scanEvents = (np.cumsum(1 + hasScan) - 1 - hasScan)[hasScan]
+		kinds[scanEvents] = 0
+		thresholds[scanEvents] = np.take(self.__scanDays, [self.__scanIndex[block[i]] for i in np.nonzero(hasScan)[0]])
+
+		#Tsys of the LOG file taken by each event, with the values of its Tsys line
+		first = self.__taken
+		taken = merge_positions([self.__logDays, self.__logTimes], kinds, thresholds, first)
+		if len(taken):
+			self.__taken = taken[-1]
+		low = min(first, self.__lastLog)
+		high = min(self.__taken, self.__lastLog)
+		merged = np.arange(low, high)
+		rows = eventRows[np.searchsorted(taken, merged, side='right')]
+		logValid = np.zeros((len(merged), self.__logValues.shape[1]), dtype=bool)
+		columns = min(self.__logValues.shape[1], tsys.shape[1])
+		logValid[:,:columns] = valid[rows,:columns]
+		logText, logStarts = antab_lines('! ', self.__logTimes[merged], self.__logValues[merged], logValid)
+		eventStarts = logStarts[np.minimum(np.append(first, taken), high) - low].tolist()
+
+		out = []
+		e = 0
+		for i in range(0,n):
+			if i in setupRows:
+				setupTime_ind = setupRows[i]
+				setup = self.__setupTime[setupTime_ind][1]
+				for ind in range(len(self.__dpfuLines[setup])):
+					if setupTime_ind > 0:
+						out.append('\n/\n')
+					out.append(self.__dpfuLines[setup][ind] + ' ' + self.__polyelevLine[setup][ind])
+				out.append('/\n')
+				out.append('TSYS %s FT = 1.0 TIMEOFF=0\n' % self.__stationName)
+				out.append(self.__indexline[setupTime_ind][0:-1]+'\n')
+				out.append('/\n')
+				out.extend(self.__header[setupTime_ind])
+			if hasScan[i]:
+				out.append(logText[eventStarts[e]:eventStarts[e+1]])
+				out.append(self.__comments[self.__scanIndex[block[i]]])
+				e += 1
+			out.append(logText[eventStarts[e]:eventStarts[e+1]])
+			e += 1
+			out.append(tsysText[tsysStarts[i]:tsysStarts[i+1]])
+		self.__f.write(''.join(out))
+
+	#-----------------------------------------------------------------------------------------------------
+	def close(self):
+		'''Write the rest of the Tsys of the LOG file, with all their values, and close the file.
+		'''
+
+		rest = range(self.__taken, self.__lastLog)
+		logText, logStarts = antab_lines('! ', self.__logTimes[rest], self.__logValues[rest], np.ones((len(rest), self.__logValues.shape[1]), dtype=bool))
+		self.__f.write(logText)
+		self.__f.write('\n/\n')
+		self.__f.close()
+#-----------------------------------------------------------------------------------------------------
+def write_antab(fileOut,header,indexline,scans,tsysline,block,time, tsyslog, setupTime, dpfuLines, polyelevLine, stationName):
+	'''Write the content of the antab file except the header, all at once (see antabWriter).
 	'''
 
-	f = open(fileOut,'a')
 	"""
 	for i in range(len(dpfuLines[0])):
 		f.write(dpfuLines[0][i] + ' ' + polyelevLine[0][i])
@@ -2177,156 +3944,144 @@ def write_antab(fileOut,header,indexline,scanline,tsysline,block,time, tsyslog,
 			dpfuLines_aux.append(setupList[1])
 	"""
 
-	tsyslogNLine = 0
-	setupTime_ind = 0
-	time_tsyslog = tsyslog[0][0]
-	for i in range(0,len(block)):
-		if setupTime_ind < len(setupTime):
-			setup = setupTime[setupTime_ind][1]
-			if setupTime[setupTime_ind][0] <= time[i]:
-				for ind in range(len(dpfuLines[setup])):
-					if setupTime_ind > 0:
-						f.write('\n/\n')
-					#f.write(dpfuLines[dpfuLines_aux.index(setup)][ind] + ' ' + polyelevLine[dpfuLines_aux.index(setup)][ind])
-					f.write(dpfuLines[setup][ind] + ' ' + polyelevLine[setup][ind])
-				f.write('/\n')
-				f.write('TSYS %s FT = 1.0 TIMEOFF=0\n' % stationName)
-				f.write(indexline[setupTime_ind][0:-1]+'\n')
-				f.write('/\n')
-
-				for line in header[setupTime_ind]:
-					f.write(line)
-				setupTime_ind += 1
-		if i == 0:
-			for j in scanline:
-				strAux = j.split('=')[1].split(' ')[0]
-				if int(strAux) == block[i]:
-					dayAux = j.split(": scanNum")[0].split(" ")
-					scanTime = int(dayAux[1]) + (int(dayAux[2].split(":")[0])/24.) + (float(dayAux[2].split(":")[1])/(24.*60.))
-					if tsyslogNLine < len(tsyslog):
-						dt = datetime.datetime.utcfromtimestamp(time_tsyslog)
-						d=dt.timetuple().tm_yday
-						h=dt.hour
-						m=dt.minute + (dt.second/60.0) + dt.microsecond/(1e6*60.0)
-						dtTsysLog = d+h/24.+m/(24.*60.)
-						while dtTsysLog <= scanTime:
-							strLine = '\n! %03d %02d:%05.2f'%(d,h,m)
-							for j_tsys in range(1,len(tsyslog[tsyslogNLine])):
-								try:
-									int(tsysline[i][j_tsys-1])
-								except:
-									continue
-								strLine=strLine+' %.1f' % tsyslog[tsyslogNLine][j_tsys]
-							tsyslogNLine += 1
-							if tsyslogNLine < len(tsyslog):
-			        				time_tsyslog = tsyslog[tsyslogNLine][0]
-								dt = datetime.datetime.utcfromtimestamp(time_tsyslog)
-								d=dt.timetuple().tm_yday
-								h=dt.hour
-								m=dt.minute + (dt.second/60.0) + dt.microsecond/(1e6*60.0)
-								dtTsysLog = d+h/24.+m/(24.*60.)
-							else:
-								break
-							f.write(strLine)
-
-					f.write(j)
-					break
-		else:
-			if block[i]!=block[i-1]:
-				for j in scanline:
-					strAux = j.split('=')[1].split(' ')[0]
-					if int(strAux) == block[i]:
-						dayAux = j.split(": scanNum")[0].split(" ")
-						scanTime = int(dayAux[1]) + (int(dayAux[2].split(":")[0])/24.) + (float(dayAux[2].split(":")[1])/(24.*60.))
-						if tsyslogNLine < len(tsyslog):
-							dt = datetime.datetime.utcfromtimestamp(time_tsyslog)
-							d=dt.timetuple().tm_yday
-							h=dt.hour
-							m=dt.minute + (dt.second/60.0) + dt.microsecond/(1e6*60.0)
-							dtTsysLog = d+h/24.+m/(24.*60.)
-							while dtTsysLog <= scanTime:
-								strLine = '\n! %03d %02d:%05.2f'%(d,h,m)
-								for j_tsys in range(1,len(tsyslog[tsyslogNLine])):
-									try:
-										int(tsysline[i][j_tsys-1])
-									except:
-										continue
-									strLine=strLine+' %.1f' % tsyslog[tsyslogNLine][j_tsys]
-								tsyslogNLine += 1
-								if tsyslogNLine < len(tsyslog):
-									time_tsyslog = tsyslog[tsyslogNLine][0]
-									dt = datetime.datetime.utcfromtimestamp(time_tsyslog)
-									d=dt.timetuple().tm_yday
-									h=dt.hour
-									m=dt.minute + (dt.second/60.0) + dt.microsecond/(1e6*60.0)
-									dtTsysLog = d+h/24.+m/(24.*60.)
-								else:
-									break
-								f.write(strLine)
-
-						f.write(j)
-						break
+	writer = antabWriter(fileOut, header, indexline, scans, tsyslog, setupTime, dpfuLines, polyelevLine, stationName)
+	writer.write(tsysline, block, time)
+	writer.close()
+#-----------------------------------------------------------------------------------------------------
+def write_provisional(fileOut, logData, stationName, written):
+	'''Append the Tsys calculated since the last call to the provisional ANTAB file of a followed LOG file.
+	Tsys are written as they were calculated, without any flagging (-1 means that Tsys could not be calculated).
+	A TSYS block is started when the setup changes and a scan comment is written when the scan changes.
 
-		if tsyslogNLine < len(tsyslog):
-			while time_tsyslog <= time[i]:
-				dt = datetime.datetime.utcfromtimestamp(time_tsyslog)
-				d=dt.timetuple().tm_yday
-	                	h=dt.hour
-	                	m=dt.minute + dt.second/60.0 + dt.microsecond/(1e6*60.0)
-				strLine = '\n! %03d %02d:%05.2f'%(d,h,m)
-				for j in range(1,len(tsyslog[tsyslogNLine])):
-					try:
-						int(tsysline[i][j-1])
-					except:
-						continue
-					strLine=strLine+' %.1f' % tsyslog[tsyslogNLine][j]
-				tsyslogNLine += 1
-				if tsyslogNLine < len(tsyslog):
-			        	time_tsyslog = tsyslog[tsyslogNLine][0]
-				else:
-					break
-				f.write(strLine)
+	@param written Tuple (Tsys rows, setup index) already written, as returned by the last call. (0, -1) the first time.
+	@return Tuple (Tsys rows, setup index) written.
+	'''
+
+	header, indexline, scanline, tsysline, block, time, tsyslog, setupTime = logData
+	rows, setupInd = written
+
+	scans = dict()
+	for j in scanline:
+		scans[int(j.split('=')[1].split(' ')[0])] = j
+
+	f = open(fileOut,'a')
+	for i in range(rows, len(time)):
+		newSetupInd = setupInd
+		while newSetupInd + 1 < len(setupTime) and setupTime[newSetupInd + 1][0] <= time[i]:
+			newSetupInd += 1
+		if newSetupInd != setupInd:
+			setupInd = newSetupInd
+			if i > 0:
+				f.write('\n/\n')
+			f.write('TSYS %s FT = 1.0 TIMEOFF=0\n' % stationName)
+			f.write(indexline[setupInd][0:-1]+'\n')
+			f.write('/\n')
+			f.write(header[setupInd])
+
+		if (i == 0 or block[i] != block[i-1]) and block[i] in scans:
+			f.write(scans[block[i]])
 
 		dt = datetime.datetime.utcfromtimestamp(time[i])
 		d=dt.timetuple().tm_yday
-	        h=dt.hour
-	        m=dt.minute + (dt.second/60.0) + dt.microsecond/(1e6*60.0)
-		#h_float, d= math.modf(time[i])
-		#h_float *= 24.0
-		#m, h = math.modf(h_float)
-		#m *= 60.
-		#m=int((time[i]-(d + (h/24.)))*(60*24))
-		#s=int((time[i]-(d + (h/24.) + (m/(60.*24.))))*(3600*24))
-		#us=int((time[i]-(d + (h/24.) + (m/(60.*24.)) + (s/(3600.*24.)))) * (3600*24*1e2))
-
+		h=dt.hour
+		m=dt.minute + (dt.second/60.0) + dt.microsecond/(1e6*60.0)
 		strline='\n%03.0f %02.0f:%05.2f'%(d,h,m)
 		for j in tsysline[i]:
-			try:
-				int(j)
-			except:
-				continue
 			strline=strline+' %.1f'%j
 		f.write(strline)
+	f.close()
 
-	while tsyslogNLine < len(tsyslog):
-		dt = datetime.datetime.utcfromtimestamp(time_tsyslog)
-		d=dt.timetuple().tm_yday
-		h=dt.hour
-		m=dt.minute + dt.second/60.0 + dt.microsecond/(1e6*60.0)
-		strLine = '\n! %03d %02d:%05.2f'%(d,h,m)
-		for j in range(1,len(tsyslog[tsyslogNLine])):
-			strLine=strLine+' %.1f' % tsyslog[tsyslogNLine][j]
-		tsyslogNLine += 1
-		if tsyslogNLine < len(tsyslog):
-			time_tsyslog = tsyslog[tsyslogNLine][0]
-		else:
-			break
-		f.write(strLine)
+	return len(time), setupInd
+#-----------------------------------------------------------------------------------------------------
+def follow_log(logF, antabFile):
+	'''Follow a LOG file while the FS is writing it. Every followPoll seconds the new lines are read and
+	the new Tsys are appended to a provisional ANTAB file. Ctrl+C stops following: the rest of the LOG file
+	is read and the ANTAB file is made as usual.
 
-	f.write('\n/\n')
-	f.close()
+	@param logF logFile object created with follow=True
+	@param antabFile Name of the ANTAB file. The provisional one has the suffix ".provisional"
+	'''
+
+	provisionalFile = antabFile + '.provisional'
+	open(provisionalFile, 'w').close()
+	written = write_provisional(provisionalFile, logF.getLogData(), logF.stationName, (0, -1))
+
+	print 'Following %s. Provisional Tsys in %s' % (logF.logname, provisionalFile)
+	print 'Press Ctrl+C when the observation has finished.'
+
+	# Ctrl+C only asks to stop: it is checked between readings, so a reading is never left half done
+	stop = []
+	def interrupt(signum, frame):
+		stop.append(signum)
+	previousHandler = signal.signal(signal.SIGINT, interrupt)
+	try:
+		while not stop:
+			sleep(followPoll)		# Cut short by Ctrl+C
+			if stop:
+				break
+			if logF.update():
+				written = write_provisional(provisionalFile, logF.getLogData(), logF.stationName, written)
+				print '%d Tsys read' % written[0]
+	finally:
+		signal.signal(signal.SIGINT, previousHandler)
+
+	logF.finish()
+	print 'End of %s' % logF.logname
 #-----------------------------------------------------------------------------------------------------
 def prefilter(tsysline,block,maxlim):
+	'''Replaces the bad Tsys (negative or over maxlim) by the geometric mean of the good Tsys of their scan.
+	If their scan has no good Tsys, the next scan with good Tsys (up to 19 samples ahead) is used, and if there is none,
+	all the good Tsys of the channel. The result is the same as replacing the bad Tsys one by one (see prefilter_loop):
+	the first bad Tsys of every scan of every channel are replaced at once and only the next ones, which also use the
+	Tsys already replaced, one by one.
+	'''
+
+	tsysline=np.array(tsysline);block=np.array(block)
+	if tsysline.ndim!=2 or tsysline.shape[1]!=len(block) or tsysline.dtype.kind!='f' or (np.diff(block)<0).any():
+		return prefilter_loop(tsysline,block,maxlim)		#the scans must be sorted
+	tsysline=np.ascontiguousarray(tsysline)			#flat is a view of it
+	rows,n=tsysline.shape
+	orig=tsysline.copy()
+	flat=tsysline.reshape(-1)
+	bad=(flat<0)+(flat>maxlim)
+	if not bad.any():
+		return tsysline
+
+	scans,scan=np.unique(block,return_inverse=True)
+	starts=np.searchsorted(block,scans,'left')			#samples of each scan
+	ends=np.searchsorted(block,scans,'right')
+	group=(np.arange(rows)[:,None]*len(scans)+scan).ravel()	#a group for each scan of each channel
+	good=(flat>0)*(flat<maxlim)
+	gm=group_geomeans(flat[good],group[good],rows*len(scans))	#geometric mean of each scan of each channel
+	hasgood=(np.bincount(group[good],minlength=rows*len(scans))>0)[group]
+	nextgood=np.column_stack((next_good(hasgood.reshape(rows,n))[:,1:],np.zeros(rows,dtype=int)+n)).ravel()	#next sample after each one whose scan has good Tsys
+
+	badpos=np.nonzero(bad)[0]
+	row,col=np.divmod(badpos,n)
+	ahead=nextgood[badpos]-col
+	ahead=(ahead<=19)&(col+ahead<=n-2)		#the next scan with good Tsys can be used
+	first=np.concatenate(([True],group[badpos[1:]]!=group[badpos[:-1]]))		#first bad Tsys of each scan
+	now=first&(hasgood[badpos]|ahead)
+	flat[badpos[now&hasgood[badpos]]]=gm[group[badpos[now&hasgood[badpos]]]]
+	forward=now&~hasgood[badpos]
+	flat[badpos[forward]]=gm[group[row[forward]*n+nextgood[badpos[forward]]]]
+
+	for p,r,j,useahead in zip(badpos[~now],row[~now],col[~now],ahead[~now]):
+		oklist=flat[r*n+starts[scan[j]]:r*n+ends[scan[j]]]
+		oklist=oklist[(oklist>0)*(oklist<maxlim)]
+		if len(oklist)==0:
+			if useahead:
+				flat[p]=gm[group[r*n+nextgood[p]]]
+				continue
+			current=np.concatenate((flat[r*n:p],orig[r,j:]))		#if nothing good, compute mean of all data
+			oklist=current[(current>0)*(current<maxlim)]
+		flat[p]=np.multiply.reduce(oklist**(1/float(len(oklist)))) if len(oklist) else 1
+	return tsysline
+#-----------------------------------------------------------------------------------------------------
+def prefilter_loop(tsysline,block,maxlim):
+	'''prefilter replacing the bad Tsys one by one. It is used when the scans are not sorted.
+	'''
+
 	tsysline=np.array(tsysline);block=np.array(block)
 	for i in range(0,len(tsysline)):
 		#badcond=(tsysline[i]<0)+(tsysline[i]>maxlim)
@@ -2353,7 +4108,7 @@ def prefilter(tsysline,block,maxlim):
 	return tsysline
 #-----------------------------------------------------------------------------------------------------
 #-----------------------------------------------------------------------------------------------------
-def main(args):
+def main(args, follow=False, cache=True, auto=False):
 	#read data
 
 	helpStr = ""
@@ -2376,20 +4131,27 @@ def main(args):
 
 	antabFile = os.path.dirname(os.path.abspath(__file__)) + ('/%s.antabfs' % (logFileName.split('/')[-1].split('.')[0]))
 
-	logF = logFile(logFileName)
+	if auto:
+		plt.switch_backend('Agg')		#no windows
+	if not cache:
+		global rxgCacheFile
+		rxgCacheFile = None		# The RXG files are read again too
+	if follow:
+		logF = logFile(logFileName, follow=True)
+		follow_log(logF, antabFile)
+	else:
+		logF = logFile(logFileName, cache=cache)
 	#antabH = antabHeader(logFileName)
 	antabH = antabHeader(logF)  #FJB
 
-	bbclist=[];tsyswrite=[]
-	tsyswrite_aux = []
-	timewrite_aux = []
-	blockwrite_aux = []
+	bbclist=[]
 	maxlim=10000
 
 	logData = logF.getLogData()
+	channels = logF.channelTables()
 	header = logData[0]
 	indexline = logData[1]
-	scanline = logData[2]
+	scans = logF.scanTable()
 	tsysline = logData[3]
 	block = logData[4]
 	time = logData[5]
@@ -2399,131 +4161,102 @@ def main(args):
 	#bands = logF.loArray()
 	#header,indexline,scanline,tsysline,block,time=readlog(logFileName)
 
-	startInd = 0
-	for bP in range(len(setupTime)):
-
-		hLines = header[bP].split('\n')[4:]
-		bbclist = []
-		for i in hLines:
-			auxStr = i.split()
-			bbclist.append(auxStr[4].strip(',') + ' ' + auxStr[5].strip(',')+' '+auxStr[9].strip(',')+', Freq '+auxStr[6]+' MHz, '+auxStr[3][0]+'CP' )
+	# The Tsys of each setup are written as soon as they are flagged. The preamble goes before them if they are saved.
+	partFile = antabFile + '.part'
+	open(partFile, 'w').close()
+	try:
+		writer = antabWriter(partFile, header, indexline, scans, tsyslog, setupTime, antabH.dpfuLines(), antabH.polyelevLine(), logF.stationName)
+
+		bounds = setup_bounds(time, setupTime)
+		days = day_fractions(time)		# Time axis of the plots
+		for bP in range(len(setupTime)):
+
+			bbclist = []
+			for ch in channels[bP]:
+				bbclist.append('if%s bbc%02d %sSB, Freq %.2f MHz, %sCP' % (ch['if'], ch['bbc'], ch['sideband'], ch['freq'], ch['label'][0]))
+
+			startInd, endInd = bounds[bP], bounds[bP+1]
+			tsysline_aux = tsysline.tsys(startInd, endInd)		# Tsys matrix of this part (a new array)
+			block_aux = block[startInd:endInd].tolist()
+			time_aux = time[startInd:endInd].tolist()
+			x = days[startInd:endInd].tolist()
+			xplot = list(x)			# Time axis of the Tsys lines kept, for the final plot
+
+
+			tptsys=np.matrix.transpose(tsysline_aux)
+			tptsys=prefilter(tptsys,block_aux,maxlim)	#filter negative values
+
+			#loop analizing all bbcs
+			if not auto:
+				print 'Draw a rectangle over the points that you want to delete. Then, close the window.'
+			alltsys_aux = []
+			for i in range(0,len(tptsys)):
+				fully=tptsys[i][:]
+				#if len(fully) != len(time_aux):
+				#	continue
+				if not debug:
+					if auto:
+						results=AutoSelection(x,fully,block_aux,bbclist[i])
+					else:
+						results=Selection(x,fully,block_aux,bbclist[i])
+					delIndX = results.getDeletedX()
+					delIndX.reverse()
 
-		if bP == (len(setupTime)-1):
-			endInd = len(time)
-		else:
-			for ind in range(len(time)):
-				if time[ind] >= setupTime[bP+1][0]:
-					endInd = ind
-					break
+					if delIndX != []:
+						for ind in delIndX:
+							time_aux.pop(ind)
+							block_aux.pop(ind)
+							xplot.pop(ind)
 
-		tsysline_aux = tsysline[startInd:endInd]
-		block_aux = block[startInd:endInd]
-		time_aux = time[startInd:endInd]
-		x = []
-		for time_ind in range(len(time_aux)):
-			x_val = time_aux[time_ind]
-			dt = datetime.datetime.utcfromtimestamp(x_val)
-			days = (dt - datetime.datetime(dt.year,1,1,dt.hour,dt.minute,dt.second,dt.microsecond)).days + 1
-			t = days + (dt.hour/24.) + (dt.minute/(60.*24.)) + (dt.second/(3600.*24.)) + (dt.microsecond/(3600.*24.*1e6))
-			x.append(t)
-
-
-		tptsys=np.matrix.transpose(np.array(tsysline_aux))
-		tptsys=prefilter(tptsys,block_aux,maxlim)	#filter negative values
-
-		#loop analizing all bbcs
-		print 'Draw a rectangle over the points that you want to delete. Then, close the window.'
-		alltsys_aux = []
-		for i in range(0,len(tptsys)):
-			fully=tptsys[i][:]
-			#if len(fully) != len(time_aux):
-			#	continue
-			if not debug:
-				results=Selection(x,fully,block_aux,bbclist[i])
-				delIndX = results.getDeletedX()
-				delIndX.reverse()
-
-				if delIndX != []:
-					for ind in delIndX:
-						time_aux.pop(ind)
-						block_aux.pop(ind)
-
-				alltsys_aux.append(results.y)
-			else:
-				alltsys_aux.append(fully)
-
-		if not debug:
-			if time_aux and alltsys_aux:
-				x = []
-		                for time_ind in range(len(time_aux)):
-					x_val = time_aux[time_ind]
-					dt = datetime.datetime.utcfromtimestamp(x_val)
-					days = (dt - datetime.datetime(dt.year,1,1,dt.hour,dt.minute,dt.second,dt.microsecond)).days + 1
-					t = days + (dt.hour/24.) + (dt.minute/(60.*24.)) + (dt.second/(3600.*24.)) + (dt.microsecond/(3600.*24.*1e6))
-					x.append(t)
-
-				finalplot(x,alltsys_aux,bbclist, bP)
-
-		tsyswrite_aux.append(np.matrix.transpose(np.array(alltsys_aux)))
-		timewrite_aux.append(time_aux)
-		blockwrite_aux.append(block_aux)
-
-		startInd = endInd
-
-	#print 'Close the plot and choose an option:'
-	save=raw_input('Would you like to save the results? y/n: ')
-	if save == 'y':
-		dpfuLines, polyelevLine = antabH.writeAntabPreamble(antabFile)
-		tsyswrite = None
-		timewrite = None
-		blockwrite = None
-		for ind in range(len(setupTime)):
-			if tsyswrite_aux[ind].size != 0:
-				if tsyswrite is None:
-					tsyswrite = tsyswrite_aux[ind]
-				else:
-					if tsyswrite_aux[ind].shape[1] != tsyswrite.shape[1]:
-						ncol = max(tsyswrite_aux[ind].shape[1],tsyswrite.shape[1])
-						if ncol != tsyswrite_aux[ind].shape[1]:
-							coldiff = ncol - tsyswrite_aux[ind].shape[1]
-							nrow = tsyswrite_aux[ind].shape[0]
-							nan_matrix = np.zeros((nrow,coldiff))
-							nan_matrix.fill(np.nan)
-							tsyswrite_aux[ind] = np.concatenate((tsyswrite_aux[ind],nan_matrix),axis=1)
-						elif ncol != tsyswrite.shape[1]:
-							coldiff = ncol - tsyswrite.shape[1]
-							nrow = tsyswrite.shape[0]
-							nan_matrix = np.zeros((nrow,coldiff))
-							nan_matrix.fill(np.nan)
-							tsyswrite = np.concatenate((tsyswrite,nan_matrix),axis=1)
-
-					tsyswrite = np.concatenate((tsyswrite, tsyswrite_aux[ind]), axis=0)
-			if len(timewrite_aux) != 0:
-				if timewrite is None:
-					timewrite = copy(timewrite_aux[ind])
-					blockwrite = copy(blockwrite_aux[ind])
+					alltsys_aux.append(results.y)
 				else:
-					timewrite += timewrite_aux[ind]
-					blockwrite += blockwrite_aux[ind]
-		if tsyswrite is None:
-			tsyswrite = np.array([])
-
-		#write_antab(antabFile, header, indexline, scanline, tsyswrite, block, time, tsyslog, setupTime, dpfuLines, polyelevLine, logF.stationName)
-		write_antab(antabFile, header, indexline, scanline, tsyswrite, blockwrite, timewrite, tsyslog, setupTime, dpfuLines, polyelevLine, logF.stationName)
-		print 'Results in file %s' % antabFile
-	else:
-		print 'Results not saved'
+					alltsys_aux.append(fully)
+
+			if not debug and not auto:
+				if time_aux and alltsys_aux:
+					finalplot(xplot,alltsys_aux,bbclist, bP)
+
+			writer.write(np.matrix.transpose(np.array(alltsys_aux)), block_aux, time_aux)
+		writer.close()
+
+		#print 'Close the plot and choose an option:'
+		if auto:
+			save='y'
+		else:
+			save=raw_input('Would you like to save the results? y/n: ')
+		if save == 'y':
+			antabH.writeAntabPreamble(antabFile)
+			fOut = open(antabFile, 'a')
+			fIn = open(partFile, 'r')
+			shutil.copyfileobj(fIn, fOut)
+			fIn.close()
+			fOut.close()
+			print 'Results in file %s' % antabFile
+		else:
+			print 'Results not saved'
+	finally:
+		os.remove(partFile)		# Also if flagging is stopped or fails
+		save_rxg_cache()
 #-----------------------------------------------------------------------------------------------------
 def usage():
     pydoc.pager(
 """
-Usage: {progname} [-f rxgfile_list] logfile
+Usage: {progname} [-f rxgfile_list] [--follow] [--no-cache] [--auto] logfile
 
 Script to generate ANTAB files for its use with AIPS.
 Version: {date_version}
 
 Options:
 	-f : Allows the user to specify rxgfile_list, a list of RXG files comma separated.
+	--follow : Follows the log file while the observation is running. Every {poll} seconds the new lines are
+		   read and the new Tsys are appended to a provisional ANTAB file (.antabfs.provisional).
+		   Press Ctrl+C when the observation has finished to make the ANTAB file as usual.
+	--no-cache : Reads the log file again. By default the result of reading the log file is saved in {cachedir}
+		     and used by the next runs until the log file or the RXG files change.
+		     The RXG files read are saved in {rxgcache} and read again only when they change.
+	--auto : Flags the data without windows and saves the ANTAB file without asking. The outliers of the fit of
+		 each scan are replaced by the geometric mean of the rest of the scan, as when a rectangle is drawn,
+		 and the fit is done again, at most 10 times. A warning is printed for the channels with outliers left.
 
 
 All RXG files are supposed to be under /usr2/control/rxg_files/. If the -f option is not given, the script
@@ -2531,18 +4264,22 @@ will search there for a valid RXG file. Valid files are those which define a fre
 the observed setup in the log file AND match the station code in the log file name. To do so it must be
 named with the station code as Sc, e.g.:
 calYsQ.rxg
-""".format(progname=sys.argv[0],date_version=version))
+""".format(progname=sys.argv[0],date_version=version,poll=followPoll,cachedir=cacheDirectory,rxgcache=rxgCacheFile))
 
 #-----------------------------------------------------------------------------------------------------
 #-----------------------------------------------------------------------------------------------------
 if __name__=='__main__':
-	if len(sys.argv)==1 or '-h' in sys.argv:
+	follow = '--follow' in sys.argv
+	cache = not '--no-cache' in sys.argv
+	auto = '--auto' in sys.argv
+	args = [i for i in sys.argv if not i in ['--follow', '--no-cache', '--auto']]
+	if len(args)==1 or '-h' in args:
 	        usage()
         	sys.exit( 0 )
-	elif len(sys.argv) == 2:
-		main(sys.argv)
-	elif len(sys.argv) == 4 and '-f' in sys.argv:
-		rxg = sys.argv[2]
+	elif len(args) == 2:
+		main(args, follow, cache, auto)
+	elif len(args) == 4 and '-f' in args:
+		rxg = args[2]
 		rxgfiles = rxg.split(',')
 		print rxgfiles
-		main(sys.argv)
+		main(args, follow, cache, auto)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python2
+#-*- coding: utf-8 -*-
+
+# Benchmark of the LOG file reading of antabfs.py.
+# It writes a synthetic FS LOG file with continuous calibration (DBBC DDC, 2 setups) and the usual chatter of a
+# station (weather, antenna, recorder and flag lines), and reads it with antabfs.logFile twice: the first time it is
+# parsed and saved in the cache file, the second time it is loaded from it. Both results must be the same.
+#
+# The RXG files are read from /usr2/control/rxg_files/ as antabfs.py does, so run it in a station computer.
+
+import sys
+import os
+import time
+import random
+import datetime
+import tempfile
+
+import antabfs
+
+#----------------------------------------------------------------------------------------------------------------------------------------------------------
+def timeTag(t):
+	'''Time tag of the LOG lines: "yyyy.ddd.hh:mm:ss.ss"
+
+	@param t datetime.datetime
+	'''
+
+	return "%04d.%03d.%02d:%02d:%02d.%02d" % (t.year, t.timetuple().tm_yday, t.hour, t.minute, t.second, t.microsecond/10000)
+
+#----------------------------------------------------------------------------------------------------------------------------------------------------------
+def writeLog(fileName, sizeMB):
+	'''Writes a synthetic FS LOG file.
+
+	@param fileName Name of the LOG file. The station code is taken from it by antabfs.py ("xxxxxxys.log")
+	@param sizeMB Approximate size of the LOG file in MB.
+	'''
+
+	random.seed(1)
+	t = [datetime.datetime(2021, 4, 11, 9, 0, 0)]
+	logfOut = open(fileName, 'w')
+
+	def write(record, step=0.01):
+		logfOut.write(timeTag(t[0]) + record + "\n")
+		t[0] += datetime.timedelta(seconds=step)
+
+	chatter = ["/wx/12.3,945.2,67.8", "/onsource/TRACKING", "#flagr#flagr/antenna,acquired",
+		   "/mk5=status?", "!mk5/!status?0:0:0x00000001;", "#antcn#ACU: az 123.4567 el 45.6789",
+		   "/fivpt/xoffset", "#rdtcn#rdtc/status,ok,1pps,0.000012", "/bread/rdbe=dbe_sync?;"]
+
+	write(";Log Opened: Mark IV Field System Version 10.0.0")
+	write(";Rack=DBBC_DDC  Recorder 1=FLEXBUFF")
+	scan = 0
+	while logfOut.tell() < sizeMB * 1024 * 1024:
+		scan += 1
+		setup = "%02d" % (1 + scan % 2)
+		write(":scan_name=no%04d,bench01,ys,120,120" % scan)
+		write(":source=src%d,164258.82,394837.0,2000.0,neutral" % (scan % 3))
+		write(":setup%s" % setup)
+		write("&setup%s/ifdab" % setup)
+		write("&setup%s/form=astro" % setup)
+		write("&setup%s/mk5c_mode=vdif,0xffffffff,,16" % setup)
+		write("&setup%s/cont_cal=on,2,80" % setup)
+		write("&setup%s/dbbc01d" % setup)
+		for bbc in range(1, 9):
+			write("&dbbc01d/bbc%02d=%.2f,%s,16.00" % (bbc, 600 + 32*bbc + 7*(scan % 2), 'a' if bbc <= 4 else 'b'))
+		write("&ifdab/lo=")
+		write("&ifdab/lo=loa,4500.00,usb,rcp,1.000")
+		write("&ifdab/lo=lob,4500.00,usb,lcp,1.000")
+		write(":preob")
+		write(":data_valid=on")
+		for second in range(120):
+			for chans in ['12345678', '12345678']:
+				values = []
+				for c in chans:
+					on = random.randint(17000, 18000)
+					values.append("%sl,%d,%d,%su,%d,%d" % (c, on, on - random.randint(200, 900), c, on, on - random.randint(200, 900)))
+				write("#tpicd#tpcont/" + ",".join(values), 0.03)
+			for i in range(8):
+				write(random.choice(chatter), 0.05)
+			t[0] += datetime.timedelta(seconds=0.4)
+		write(":data_valid=off")
+		write(":postob")
+		t[0] += datetime.timedelta(seconds=20)
+	write(";Log Closed")
+	logfOut.close()
+
+#----------------------------------------------------------------------------------------------------------------------------------------------------------
+def result(log):
+	'''Content of logFile.logData that can be compared.
+
+	@param log antabfs.logFile
+	'''
+
+	logData = log.getLogData()
+	tsys = logData[3]
+	return repr(logData[:3] + logData[6:]), tsys.tsys().tolist(), tsys.scan().tolist(), tsys.time().tolist()
+
+#----------------------------------------------------------------------------------------------------------------------------------------------------------
+def usage():
+	print "Usage: %s [size_MB]	(default: 1024 MB)" % sys.argv[0]
+
+#----------------------------------------------------------------------------------------------------------------------------------------------------------
+if __name__=="__main__":
+	if '-h' in sys.argv:
+		usage()
+		sys.exit(0)
+	sizeMB = 1024
+	if len(sys.argv) == 2:
+		sizeMB = float(sys.argv[1])
+
+	tmpDir = tempfile.mkdtemp()
+	logName = os.path.join(tmpDir, "bench01ys.log")
+	try:
+		start = time.time()
+		writeLog(logName, sizeMB)
+		print "LOG file: %.1f MB written in %.1f s" % (os.path.getsize(logName)/1024.0/1024.0, time.time() - start)
+
+		antabfs.cacheDirectory = tmpDir		# The cache file of the LOG file is removed with it
+		results = []
+		for name in ["parse", "cache"]:
+			start = time.time()
+			log = antabfs.logFile(logName, cache=True)
+			print "%-12s %8.2f s" % (name, time.time() - start)
+			results.append(result(log))
+		print "Same result: %s" % (results[0] == results[1])
+	finally:
+		for name in os.listdir(tmpDir):
+			os.remove(os.path.join(tmpDir, name))
+		os.rmdir(tmpDir)